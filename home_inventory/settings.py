@@ -203,6 +203,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'inventory.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
@@ -215,6 +219,7 @@ REST_FRAMEWORK = {
 
 # Swagger settings for token authentication
 SWAGGER_SETTINGS = {
+    'DEFAULT_INFO': 'home_inventory.urls.api_info',
     'SECURITY_DEFINITIONS': {
         'Token': {
             'type': 'apiKey',
@@ -226,8 +231,14 @@ SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
     'LOGIN_URL': '/admin/login/',
     'LOGOUT_URL': '/admin/logout/',
+    'DEEP_LINKING': False,
+    'SHOW_EXTENSIONS': False,
 }
 
+# Pre-generated OpenAPI schema (python manage.py generate_swagger schema.json).
+# When the file exists it is served as /swagger.json instead of building the schema at runtime.
+SWAGGER_SCHEMA_FILE = BASE_DIR / 'schema.json'
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -18,40 +18,64 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from django.http import HttpResponse
 from django.views.generic import RedirectView
 from django.views.i18n import set_language
+from django.views.decorators.cache import cache_page
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from inventory import views
 
+# Schema generation walks every API route; serve it from cache instead of rebuilding per request
+SCHEMA_CACHE_TIMEOUT = 60 * 15
+
+# API description shared by the schema views and `manage.py generate_swagger` (SWAGGER_SETTINGS['DEFAULT_INFO'])
+api_info = openapi.Info(
+   title="Home Inventory API",
+   default_version='v1',
+   description="API documentation for Home Inventory Management System. "
+               "To use the API:\n"
+               "1. First, obtain a token by calling `POST /v1/api/auth/token/` with your username and password.\n"
+               "2. Copy the token from the response.\n"
+               "3. Click the 'Authorize' button (🔒) at the top of the page.\n"
+               "4. Enter: `Token <your_token>` (replace <your_token> with the actual token).\n"
+               "5. Click 'Authorize' and then 'Close'.",
+   terms_of_service="https://www.google.com/policies/terms/",
+   contact=openapi.Contact(email="contact@homeinventory.local"),
+   license=openapi.License(name="MIT License"),
+)
+
+# REST API routes; shared by urlpatterns and the schema generator
+api_urlpatterns = [
+    path('v1/api/', include('inventory.api_urls')),
+]
+
 # Swagger schema view with token authentication
 schema_view = get_schema_view(
-   openapi.Info(
-      title="Home Inventory API",
-      default_version='v1',
-      description="API documentation for Home Inventory Management System. "
-                  "To use the API:\n"
-                  "1. First, obtain a token by calling `POST /v1/api/auth/token/` with your username and password.\n"
-                  "2. Copy the token from the response.\n"
-                  "3. Click the 'Authorize' button (🔒) at the top of the page.\n"
-                  "4. Enter: `Token <your_token>` (replace <your_token> with the actual token).\n"
-                  "5. Click 'Authorize' and then 'Close'.",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="contact@homeinventory.local"),
-      license=openapi.License(name="MIT License"),
-   ),
+   api_info,
    public=True,
    permission_classes=(permissions.AllowAny,),
-   patterns=[
-      path('v1/api/', include('inventory.api_urls')),
-   ],
+   patterns=api_urlpatterns,
 )
 
+# Serve the pre-generated schema file when present; it never changes between deploys
+SCHEMA_FILE = getattr(settings, 'SWAGGER_SCHEMA_FILE', None)
+static_schema_urlpatterns = []
+if SCHEMA_FILE and SCHEMA_FILE.exists():
+    schema_bytes = SCHEMA_FILE.read_bytes()
+    
+    @cache_page(60 * 60 * 24)
+    def static_schema(request):
+        return HttpResponse(schema_bytes, content_type='application/json')
+    
+    static_schema_urlpatterns.append(re_path(r'^swagger\.json$', static_schema, name='schema-json-static'))
+
 urlpatterns = [
     path('grappelli/', include('grappelli.urls')),
     path('i18n/setlang/', set_language, name='set_language'),
     path('', RedirectView.as_view(url='/v1/', permanent=False), name='root_redirect'),
+    *api_urlpatterns,
     path('v1/', include([
         # Home page - cached internally (user-specific)
         path('', views.home, name='home'),
@@ -67,23 +91,19 @@ urlpatterns = [
         path('notifications/<uuid:notification_id>/read/', views.notification_mark_read, name='notification_mark_read'),
         path('notifications/mark-all-read/', views.notification_mark_all_read, name='notification_mark_all_read'),
         path('analytics/', views.analytics_dashboard, name='analytics_dashboard'),
-        path('api/', include('inventory.api_urls')),
     ])),
     # Swagger URLs
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    re_path(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    *static_schema_urlpatterns,
+    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=SCHEMA_CACHE_TIMEOUT), name='schema-json'),
+    re_path(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=SCHEMA_CACHE_TIMEOUT), name='schema-swagger-ui'),
+    re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=SCHEMA_CACHE_TIMEOUT), name='schema-redoc'),
     path('admin/', admin.site.urls),
 ]
 
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    # Django Debug Toolbar
-    try:
-        import debug_toolbar
-        urlpatterns = [
-            path('__debug__/', include(debug_toolbar.urls)),
-        ] + urlpatterns
-    except ImportError:
-        pass  # debug_toolbar not installed
+
+# Django Debug Toolbar (only when enabled in INSTALLED_APPS)
+if settings.DEBUG and 'debug_toolbar' in settings.INSTALLED_APPS:
+    urlpatterns.insert(0, path('__debug__/', include('debug_toolbar.urls')))
 
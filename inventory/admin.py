@@ -1,11 +1,105 @@
+from functools import lru_cache
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Case, When, F, Value, TextField
+from django.db.models.functions import Concat, Length, Substr
+from django.db.models.lookups import GreaterThan
+from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
-from django.utils.translation import gettext_lazy as _
+from django.utils.safestring import mark_safe
+from django.utils.translation import gettext, gettext_lazy as _
 from .models import Location, Item, ItemLog, Category, Tag, LocationShare, ItemShare, Notification, AnalyticsEvent
 from .choices import ROOM_CHOICES
+from .utils import invalidate_items_cache, count_subquery, get_location_subtree_ids
+from .notifications import invalidate_unread_count
+
+User = get_user_model()
+
+PREVIEW_LENGTH = 50
+
+# Заглушки для пустых превью создаются один раз (ленивые, перевод по языку запроса)
+NO_QR_CODE = _("No QR code")
+NO_IMAGE = _("No image")
+
+
+def preview_annotation(field_name, length=PREVIEW_LENGTH):
+    """Обрезает текстовое поле до length символов на стороне БД"""
+    return Case(
+        When(
+            GreaterThan(Length(field_name), length),
+            then=Concat(Substr(field_name, 1, length), Value('...'), output_field=TextField()),
+        ),
+        default=F(field_name),
+        output_field=TextField(),
+    )
+
 
 # Create your models here.
-class LocationShareInline(admin.TabularInline):
+@lru_cache(maxsize=1024)
+def tag_badge_html(tag_id, name, color):
+    """HTML бейджа тега (кэшируется по id, имени и цвету)"""
+    return format_html(
+        '<span style="background-color: {}; color: white; padding: 2px 8px; border-radius: 12px; font-size: 11px; margin-right: 4px;">{}</span>',
+        color, name
+    )
+
+
+@lru_cache(maxsize=256)
+def color_swatch_html(color):
+    """HTML образца цвета (кэшируется по значению цвета)"""
+    return format_html(
+        '<div style="width: 30px; height: 30px; background-color: {}; border-radius: 4px; border: 1px solid #ddd;"></div>',
+        color
+    )
+
+
+class UserChoicesInlineMixin:
+    """
+    Загружает пользователей для inline-строк одним запросом.
+    
+    Без этого каждая строка inline-формы заново выполняет запрос к таблице пользователей
+    (и для выпадающего списка 'user', и для __str__ строки).
+    """
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+    
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'user':
+            kwargs['queryset'] = User.objects.only('id', 'username')
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'user' and formfield is not None:
+            if not hasattr(request, '_admin_user_choices'):
+                request._admin_user_choices = list(formfield.choices)
+            formfield.choices = request._admin_user_choices
+        return formfield
+
+
+class OnlyFieldsChangeList(ChangeList):
+    """ChangeList, загружающий только колонки из model_admin.list_only_fields"""
+    
+    def get_queryset(self, request, exclude_parameters=None):
+        return super().get_queryset(request, exclude_parameters).only(*self.model_admin.list_only_fields)
+
+
+class ListOnlyFieldsMixin:
+    """
+    Ограничивает колонки SELECT на странице списка.
+    
+    only() применяется только к changelist: форма редактирования по-прежнему получает
+    объект целиком, иначе каждое отложенное поле загружалось бы отдельным запросом.
+    """
+    list_only_fields = ()
+    
+    def get_changelist(self, request, **kwargs):
+        if self.list_only_fields:
+            return OnlyFieldsChangeList
+        return super().get_changelist(request, **kwargs)
+
+
+class LocationShareInline(UserChoicesInlineMixin, admin.TabularInline):
     """Inline для отображения shared access к локации"""
     model = LocationShare
     extra = 0
@@ -21,6 +115,10 @@ class ItemInline(admin.TabularInline):
     readonly_fields = ('created_at',)
 
 
+# Метки остаются ленивыми, чтобы перевод зависел от активного языка запроса
+ROOM_LOOKUPS = tuple(ROOM_CHOICES)
+
+
 class RoomTypeFilter(admin.SimpleListFilter):
     """Кастомный фильтр для room_type с переводами"""
     title = _('Room Type')
@@ -28,7 +126,7 @@ class RoomTypeFilter(admin.SimpleListFilter):
     
     def lookups(self, request, model_admin):
         """Возвращает список опций фильтра с переведенными названиями"""
-        return ROOM_CHOICES
+        return ROOM_LOOKUPS
     
     def queryset(self, request, queryset):
         """Фильтрует queryset по выбранному room_type"""
@@ -54,9 +152,16 @@ class LocationChildrenInline(admin.TabularInline):
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
     list_display = ('name', 'room_type_display', 'parent_display', 'owner', 'is_box', 'items_count', 'children_count', 'shares_count', 'qr_code_display')
-    list_filter = (RoomTypeFilter, 'is_box', 'parent', 'owner')
+    list_filter = (
+        RoomTypeFilter, 'is_box',
+        ('parent', admin.RelatedOnlyFieldListFilter),
+        ('owner', admin.RelatedOnlyFieldListFilter),
+    )
+    list_select_related = ('parent', 'owner')
     search_fields = ('name', 'owner__username')
-    readonly_fields = ('id', 'qr_code_display', 'items_count', 'children_count', 'shares_count', 'created_at')
+    # Вместо <select> со всеми локациями/пользователями — поиск по запросу
+    autocomplete_fields = ('parent', 'owner')
+    readonly_fields = ('id', 'qr_code_display', 'items_count', 'items_link', 'children_count', 'shares_count', 'created_at')
     fieldsets = (
         (_('Basic Information'), {
             'fields': ('id', 'name', 'room_type', 'parent', 'owner')
@@ -66,7 +171,7 @@ class LocationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         (_('Statistics'), {
-            'fields': ('items_count', 'children_count', 'shares_count'),
+            'fields': ('items_count', 'items_link', 'children_count', 'shares_count'),
             'classes': ('collapse',)
         }),
         (_('Timestamps'), {
@@ -75,6 +180,31 @@ class LocationAdmin(admin.ModelAdmin):
         }),
     )
     inlines = [LocationChildrenInline, ItemInline, LocationShareInline]
+    # Больше этого числа предметов ItemInline не рендерится, вместо него ссылка на список
+    item_inline_max_rows = 50
+    
+    def get_inlines(self, request, obj):
+        """Не строит formset для локаций с большим количеством предметов"""
+        inlines = super().get_inlines(request, obj)
+        if obj is not None and getattr(obj, '_items_count', 0) > self.item_inline_max_rows:
+            return [inline for inline in inlines if inline is not ItemInline]
+        return inlines
+    
+    def get_form(self, request, obj=None, **kwargs):
+        """Локация не может быть родителем самой себя или своих потомков"""
+        form = super().get_form(request, obj, **kwargs)
+        if obj is not None and 'parent' in form.base_fields:
+            parent_field = form.base_fields['parent']
+            parent_field.queryset = parent_field.queryset.exclude(pk__in=get_location_subtree_ids(obj.pk))
+        return form
+    
+    def get_queryset(self, request):
+        """Подтягивает parent/owner и счетчики одним запросом"""
+        return super().get_queryset(request).select_related('parent', 'owner').annotate(
+            _items_count=count_subquery(Item, 'location'),
+            _children_count=count_subquery(Location, 'parent'),
+            _shares_count=count_subquery(LocationShare, 'location'),
+        )
     
     def room_type_display(self, obj):
         """Отображение типа комнаты (переведенное)"""
@@ -88,28 +218,39 @@ class LocationAdmin(admin.ModelAdmin):
     
     def shares_count(self, obj):
         """Количество shared access"""
-        return obj.shares.count()
+        return obj._shares_count
     shares_count.short_description = _('Shared With')
+    shares_count.admin_order_field = '_shares_count'
     
     def items_count(self, obj):
         """Количество предметов в локации"""
-        return obj.items.count()
+        return obj._items_count
     items_count.short_description = _('Items Count')
+    items_count.admin_order_field = '_items_count'
     
     def children_count(self, obj):
         """Количество дочерних локаций"""
-        return obj.children.count()
+        return obj._children_count
     children_count.short_description = _('Children Count')
+    children_count.admin_order_field = '_children_count'
+    
+    def items_link(self, obj):
+        """Ссылка на список предметов, отфильтрованный по локации"""
+        if obj._state.adding:
+            return '-'
+        url = reverse('admin:inventory_item_changelist')
+        return format_html('<a href="{}?location__id__exact={}">{}</a>', url, obj.pk, _('Show items'))
+    items_link.short_description = _('Items')
     
     def qr_code_display(self, obj):
         """Отображение QR кода"""
         if obj.qr_code:
             return format_html('<img src="{}" width="100" height="100" />', obj.qr_code.url)
-        return _("No QR code")
+        return NO_QR_CODE
     qr_code_display.short_description = _('QR Code')
 
 
-class ItemShareInline(admin.TabularInline):
+class ItemShareInline(UserChoicesInlineMixin, admin.TabularInline):
     """Inline для отображения shared access к предмету"""
     model = ItemShare
     extra = 0
@@ -118,10 +259,24 @@ class ItemShareInline(admin.TabularInline):
 
 
 @admin.register(Item)
-class ItemAdmin(admin.ModelAdmin):
+class ItemAdmin(ListOnlyFieldsMixin, admin.ModelAdmin):
     list_display = ('name', 'location', 'category', 'owner', 'quantity', 'condition', 'tags_display', 'shares_count', 'image_display', 'created_at', 'updated_at')
-    list_filter = ('condition', 'location', 'category', 'tags', 'owner', 'created_at', 'updated_at')
+    # description не нужен в списке
+    list_only_fields = (
+        'id', 'name', 'quantity', 'condition', 'image', 'created_at', 'updated_at',
+        'location__name', 'category__name', 'owner__username',
+    )
+    list_filter = (
+        'condition',
+        ('location', admin.RelatedOnlyFieldListFilter),
+        ('category', admin.RelatedOnlyFieldListFilter),
+        ('tags', admin.RelatedOnlyFieldListFilter),
+        ('owner', admin.RelatedOnlyFieldListFilter),
+        'created_at', 'updated_at',
+    )
+    list_select_related = ('location', 'category', 'owner')
     search_fields = ('name', 'description', 'owner__username')
+    autocomplete_fields = ('location', 'category', 'owner')
     filter_horizontal = ('tags',)
     readonly_fields = ('id', 'created_at', 'updated_at', 'image_display', 'tags_display', 'shares_count')
     fieldsets = (
@@ -142,22 +297,25 @@ class ItemAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
     inlines = [ItemShareInline]
     
+    def get_queryset(self, request):
+        """Подтягивает связанные объекты, теги и счетчик shares одним проходом"""
+        return super().get_queryset(request).select_related(
+            'location', 'category', 'owner'
+        ).prefetch_related('tags').annotate(
+            _shares_count=Count('shares', distinct=True),
+        )
+    
     def shares_count(self, obj):
         """Количество shared access"""
-        return obj.shares.count()
+        return obj._shares_count
     shares_count.short_description = _('Shared With')
+    shares_count.admin_order_field = '_shares_count'
     
     def tags_display(self, obj):
         """Display tags with colors"""
         tags = obj.tags.all()
         if tags:
-            return format_html(
-                ' '.join([
-                    '<span style="background-color: {}; color: white; padding: 2px 8px; border-radius: 12px; font-size: 11px; margin-right: 4px;">{}</span>'.format(
-                        tag.color, tag.name
-                    ) for tag in tags
-                ])
-            )
+            return mark_safe(' '.join(tag_badge_html(tag.id, tag.name, tag.color) for tag in tags))
         return '-'
     tags_display.short_description = _('Tags')
     
@@ -165,39 +323,64 @@ class ItemAdmin(admin.ModelAdmin):
         """Отображение изображения предмета"""
         if obj.image:
             return format_html('<img src="{}" width="100" height="100" style="object-fit: cover;" />', obj.image.url)
-        return _("No image")
+        return NO_IMAGE
     image_display.short_description = _('Image')
     
     actions = ['mark_as_good_condition', 'mark_as_damaged']
     
+    def log_condition_change(self, request, items, condition):
+        """
+        Пишет логи для массового изменения состояния одним INSERT.
+        
+        queryset.update() не вызывает сигналы, поэтому логи и сброс кэша делаются здесь:
+        сбрасываются только ключи измененных предметов и их владельцев.
+        """
+        item_ids = [item_id for item_id, owner_id in items]
+        ItemLog.objects.bulk_create([
+            ItemLog(
+                item_id=item_id,
+                action='updated',
+                details=f'Condition changed to {condition} via admin',
+                user=request.user,
+            ) for item_id in item_ids
+        ], batch_size=500)
+        invalidate_items_cache(item_ids, {owner_id for item_id, owner_id in items if owner_id})
+    
     def mark_as_good_condition(self, request, queryset):
         """Действие: пометить как в хорошем состоянии"""
-        from django.utils.translation import gettext as _
+        items = list(queryset.values_list('id', 'owner_id'))
         updated = queryset.update(condition='good')
-        self.message_user(request, _('%(count)d items marked as good condition.') % {'count': updated})
+        self.log_condition_change(request, items, 'good')
+        self.message_user(request, gettext('%(count)d items marked as good condition.') % {'count': updated})
     mark_as_good_condition.short_description = _('Mark selected items as good condition')
     
     def mark_as_damaged(self, request, queryset):
         """Действие: пометить как поврежденные"""
-        from django.utils.translation import gettext as _
+        items = list(queryset.values_list('id', 'owner_id'))
         updated = queryset.update(condition='damaged')
-        self.message_user(request, _('%(count)d items marked as damaged.') % {'count': updated})
+        self.log_condition_change(request, items, 'damaged')
+        self.message_user(request, gettext('%(count)d items marked as damaged.') % {'count': updated})
     mark_as_damaged.short_description = _('Mark selected items as damaged')
 
 
 @admin.register(ItemLog)
-class ItemLogAdmin(admin.ModelAdmin):
+class ItemLogAdmin(ListOnlyFieldsMixin, admin.ModelAdmin):
     list_display = ('item', 'action', 'user', 'details_preview', 'timestamp')
-    list_filter = ('action', 'timestamp', 'user')
+    # Полный details заменен аннотацией _details_preview
+    list_only_fields = ('id', 'action', 'timestamp', 'item__name', 'user__username')
+    list_filter = ('action', 'timestamp', ('user', admin.RelatedOnlyFieldListFilter))
+    list_select_related = ('item', 'user')
     search_fields = ('item__name', 'action', 'details', 'user__username')
     readonly_fields = ('id', 'item', 'action', 'details', 'timestamp', 'user')
     date_hierarchy = 'timestamp'
     
+    def get_queryset(self, request):
+        """Предпросмотр деталей считается в БД"""
+        return super().get_queryset(request).annotate(_details_preview=preview_annotation('details'))
+    
     def details_preview(self, obj):
         """Предпросмотр деталей (первые 50 символов)"""
-        if obj.details:
-            return obj.details[:50] + '...' if len(obj.details) > 50 else obj.details
-        return '-'
+        return obj._details_preview or '-'
     details_preview.short_description = _('Details')
     
     def has_add_permission(self, request):
@@ -232,17 +415,19 @@ class CategoryAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Считает предметы в основном запросе"""
+        return super().get_queryset(request).annotate(_items_count=Count('items'))
+    
     def items_count(self, obj):
         """Количество предметов в категории"""
-        return obj.items.count()
+        return obj._items_count
     items_count.short_description = _('Items Count')
+    items_count.admin_order_field = '_items_count'
     
     def color_display(self, obj):
         """Отображение цвета"""
-        return format_html(
-            '<div style="width: 30px; height: 30px; background-color: {}; border-radius: 4px; border: 1px solid #ddd;"></div>',
-            obj.color
-        )
+        return color_swatch_html(obj.color)
     color_display.short_description = _('Color Preview')
 
 
@@ -269,60 +454,61 @@ class TagAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Считает предметы в основном запросе"""
+        return super().get_queryset(request).annotate(_items_count=Count('items'))
+    
     def items_count(self, obj):
         """Количество предметов с этим тегом"""
-        return obj.items.count()
+        return obj._items_count
     items_count.short_description = _('Items Count')
+    items_count.admin_order_field = '_items_count'
     
     def color_display(self, obj):
         """Отображение цвета"""
-        return format_html(
-            '<div style="width: 30px; height: 30px; background-color: {}; border-radius: 4px; border: 1px solid #ddd;"></div>',
-            obj.color
-        )
+        return color_swatch_html(obj.color)
     color_display.short_description = _('Color Preview')
 
 
-@admin.register(LocationShare)
-class LocationShareAdmin(admin.ModelAdmin):
-    list_display = ('location', 'user', 'role', 'created_by', 'created_at')
-    list_filter = ('role', 'created_at')
-    search_fields = ('location__name', 'user__username', 'created_by__username')
-    readonly_fields = ('id', 'created_at')
-    fieldsets = (
-        (_('Share Information'), {
-            'fields': ('id', 'location', 'user', 'role', 'created_by')
-        }),
-        (_('Timestamps'), {
-            'fields': ('created_at',),
-            'classes': ('collapse',)
-        }),
-    )
+def make_share_admin(model, target_field):
+    """Админка для модели shared access; LocationShare и ItemShare отличаются только целевым полем"""
+    class ShareAdmin(admin.ModelAdmin):
+        list_display = (target_field, 'user', 'role', 'created_by', 'created_at')
+        list_filter = ('role', 'created_at')
+        list_select_related = (target_field, 'user', 'created_by')
+        search_fields = (f'{target_field}__name', 'user__username', 'created_by__username')
+        autocomplete_fields = (target_field, 'user', 'created_by')
+        readonly_fields = ('id', 'created_at')
+        fieldsets = (
+            (_('Share Information'), {
+                'fields': ('id', target_field, 'user', 'role', 'created_by')
+            }),
+            (_('Timestamps'), {
+                'fields': ('created_at',),
+                'classes': ('collapse',)
+            }),
+        )
+    
+    ShareAdmin.__name__ = ShareAdmin.__qualname__ = f'{model.__name__}Admin'
+    return ShareAdmin
 
 
-@admin.register(ItemShare)
-class ItemShareAdmin(admin.ModelAdmin):
-    list_display = ('item', 'user', 'role', 'created_by', 'created_at')
-    list_filter = ('role', 'created_at')
-    search_fields = ('item__name', 'user__username', 'created_by__username')
-    readonly_fields = ('id', 'created_at')
-    fieldsets = (
-        (_('Share Information'), {
-            'fields': ('id', 'item', 'user', 'role', 'created_by')
-        }),
-        (_('Timestamps'), {
-            'fields': ('created_at',),
-            'classes': ('collapse',)
-        }),
-    )
+LocationShareAdmin = make_share_admin(LocationShare, 'location')
+ItemShareAdmin = make_share_admin(ItemShare, 'item')
+admin.site.register(LocationShare, LocationShareAdmin)
+admin.site.register(ItemShare, ItemShareAdmin)
 
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
+class NotificationAdmin(ListOnlyFieldsMixin, admin.ModelAdmin):
     list_display = ('user', 'notification_type', 'message_preview', 'read', 'created_at')
+    # Full message and metadata are replaced by the _message_preview annotation
+    list_only_fields = ('id', 'notification_type', 'read', 'created_at', 'user__username')
     list_filter = ('notification_type', 'read', 'created_at')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'message')
-    readonly_fields = ('id', 'created_at')
+    autocomplete_fields = ('user',)
+    readonly_fields = ('id', 'read_at', 'created_at')
     fieldsets = (
         (_('Basic Information'), {
             'fields': ('id', 'user', 'notification_type', 'message', 'read')
@@ -332,30 +518,36 @@ class NotificationAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         (_('Timestamps'), {
-            'fields': ('created_at',),
+            'fields': ('read_at', 'created_at'),
             'classes': ('collapse',)
         }),
     )
     ordering = ['-created_at']
     actions = ['mark_as_read', 'mark_as_unread']
     
+    def get_queryset(self, request):
+        """Compute message preview in the database"""
+        return super().get_queryset(request).annotate(_message_preview=preview_annotation('message'))
+    
     def message_preview(self, obj):
         """Display first 50 characters of message"""
-        return obj.message[:50] + '...' if len(obj.message) > 50 else obj.message
+        return obj._message_preview
     message_preview.short_description = _('Message')
     
     def mark_as_read(self, request, queryset):
         """Mark selected notifications as read"""
-        from django.utils.translation import gettext as _
-        count = queryset.update(read=True)
-        self.message_user(request, _('%(count)d notifications marked as read.') % {'count': count})
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        count = queryset.update(read=True, read_at=timezone.now())
+        invalidate_unread_count(*user_ids)
+        self.message_user(request, gettext('%(count)d notifications marked as read.') % {'count': count})
     mark_as_read.short_description = _('Mark selected notifications as read')
     
     def mark_as_unread(self, request, queryset):
         """Mark selected notifications as unread"""
-        from django.utils.translation import gettext as _
-        count = queryset.update(read=False)
-        self.message_user(request, _('%(count)d notifications marked as unread.') % {'count': count})
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        count = queryset.update(read=False, read_at=None)
+        invalidate_unread_count(*user_ids)
+        self.message_user(request, gettext('%(count)d notifications marked as unread.') % {'count': count})
     mark_as_unread.short_description = _('Mark selected notifications as unread')
 
 
@@ -363,8 +555,10 @@ class NotificationAdmin(admin.ModelAdmin):
 class AnalyticsEventAdmin(admin.ModelAdmin):
     """Admin interface for AnalyticsEvent"""
     list_display = ('user', 'event_type', 'content_type', 'object_id', 'created_at', 'ip_address')
-    list_filter = ('event_type', 'content_type', 'created_at', 'user')
+    list_filter = ('event_type', 'content_type', 'created_at', ('user', admin.RelatedOnlyFieldListFilter))
+    list_select_related = ('user', 'content_type')
     search_fields = ('user__username', 'event_type', 'object_id', 'ip_address')
+    autocomplete_fields = ('user',)
     readonly_fields = ('id', 'created_at')
     date_hierarchy = 'created_at'
     fieldsets = (
@@ -1,39 +1,64 @@
 from functools import wraps
+from django.db import transaction
 from .services import track_event
 
+# Methods that represent a real page view; HEAD probes and OPTIONS preflights are skipped
+TRACKED_METHODS = ('GET', 'POST')
+# User-Agent fragments of search engines and crawlers
+BOT_USER_AGENT_MARKERS = ('bot', 'crawler', 'spider')
 
-def track_view(event_type, get_content_object=None):
+
+def should_track(request):
+    """Check whether the request is worth an analytics event"""
+    if request.method not in TRACKED_METHODS:
+        return False
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return False
+    user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
+    return not any(marker in user_agent for marker in BOT_USER_AGENT_MARKERS)
+
+
+def track_view(event_type, get_object_ref=None):
     """
     Decorator to track view events.
     
+    The event is recorded after the view has produced its response and, when the
+    view runs inside a transaction, only once that transaction commits.
+    Anonymous users, bots and non GET/POST requests are not tracked.
+    
     Args:
         event_type: Type of event to track (e.g., 'item_view', 'location_view')
-        get_content_object: Function to extract content object from view args/kwargs
+        get_object_ref: Function returning a (model_class, object_id) tuple from view
+                        args/kwargs. It should not query the database.
     
     Usage:
-        @track_view('item_view', lambda request, item_id: Item.objects.get(id=item_id))
+        @track_view('item_view', lambda request, item_id: (Item, item_id))
         def item_detail(request, item_id):
             ...
     """
     def decorator(view_func):
         @wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            # Track the event
-            content_object = None
-            if get_content_object:
+            response = view_func(request, *args, **kwargs)
+            if not should_track(request):
+                return response
+            
+            object_ref = None
+            if get_object_ref:
                 try:
-                    content_object = get_content_object(request, *args, **kwargs)
+                    object_ref = get_object_ref(request, *args, **kwargs)
                 except Exception:
-                    pass  # Silently fail if object not found
+                    pass  # Silently fail if reference can't be built
             
-            track_event(
+            # Track the event outside of the view's own work
+            transaction.on_commit(lambda: track_event(
                 user=request.user,
                 event_type=event_type,
-                content_object=content_object,
                 request=request,
-            )
+                object_ref=object_ref,
+            ))
             
-            return view_func(request, *args, **kwargs)
+            return response
         return wrapper
     return decorator
-
@@ -1,12 +1,212 @@
-from django.db.models import Count, Q, F
+import logging
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Sum, Q, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, TruncHour
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from datetime import timedelta
-from ..models import AnalyticsEvent, Item, Location
-from ..utils import optimize_item_queryset, optimize_location_queryset
+from ..models import AnalyticsEvent, AnalyticsRollup, Item, Location
+from ..utils import (
+    optimize_item_queryset, optimize_location_queryset,
+    get_cache_key, get_cached_or_set, CACHE_TIMEOUT_MEDIUM,
+)
 
+logger = logging.getLogger(__name__)
 
-def track_event(user, event_type, content_object=None, metadata=None, request=None):
+# Events tracked while a request is being handled; written in one INSERT after the response
+_request_events = ContextVar('analytics_request_events', default=None)
+
+# PostgreSQL advisory lock key serializing refresh_rollup() runs
+ROLLUP_LOCK_ID = 7140613
+
+# Content types of tracked models, resolved on first use
+ITEM_CONTENT_TYPE = SimpleLazyObject(lambda: ContentType.objects.get_for_model(Item))
+LOCATION_CONTENT_TYPE = SimpleLazyObject(lambda: ContentType.objects.get_for_model(Location))
+TRACKED_CONTENT_TYPES = {
+    Item: ITEM_CONTENT_TYPE,
+    Location: LOCATION_CONTENT_TYPE,
+}
+
+
+def get_content_type_id(model):
+    """Content type id of a model class, without a lookup for tracked models"""
+    content_type = TRACKED_CONTENT_TYPES.get(model)
+    if content_type is None:
+        content_type = ContentType.objects.get_for_model(model)
+    return content_type.id
+
+
+# Statistic key -> event type counted for it
+EVENT_TYPE_STATS = {
+    'item_views': 'item_view',
+    'location_views': 'location_view',
+    'item_searches': 'item_search',
+    'location_searches': 'location_search',
+    'items_created': 'item_created',
+    'items_updated': 'item_updated',
+    'items_deleted': 'item_deleted',
+    'locations_created': 'location_created',
+    'locations_updated': 'location_updated',
+    'locations_deleted': 'location_deleted',
+}
+
+
+def count_events(**kwargs):
+    """Number of raw AnalyticsEvent rows"""
+    return Count('id', **kwargs)
+
+
+def sum_rollup_counts(**kwargs):
+    """Number of events stored in AnalyticsRollup rows"""
+    return Coalesce(Sum('count', **kwargs), 0)
+
+
+def truncate_to_hour(value):
+    """Start of the hour the datetime falls in"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def counted_events(since):
+    """
+    Rows to compute aggregate statistics from and the expression counting events in them.
+    
+    With settings.ANALYTICS_USE_ROLLUP the hourly rollup is read instead of raw events;
+    the period then starts at the beginning of the hour `since` falls in.
+    """
+    if getattr(settings, 'ANALYTICS_USE_ROLLUP', False):
+        return AnalyticsRollup.objects.filter(bucket_hour__gte=truncate_to_hour(since)), sum_rollup_counts
+    return AnalyticsEvent.objects.filter(created_at__gte=since), count_events
+
+
+def event_type_aggregates(count=count_events):
+    """Aggregate expressions counting events of each tracked type"""
+    return {
+        key: count(filter=Q(event_type=event_type))
+        for key, event_type in EVENT_TYPE_STATS.items()
+    }
+
+
+def view_count_aggregates(event_type):
+    """Aggregate expressions for total views and unique viewers of one object"""
+    return {
+        'total_views': Count('id', filter=Q(event_type=event_type)),
+        'unique_viewers': Count('user', filter=Q(event_type=event_type), distinct=True),
+    }
+
+
+def annotate_view_counts(queryset, event_type, content_type_id, since, user=None):
+    """
+    Annotate view_count from analytics events in one query.
+    
+    Only objects viewed since `since` are kept, most viewed first.
+    """
+    events, count = counted_events(since)
+    view_events = events.filter(event_type=event_type, content_type_id=content_type_id)
+    if user:
+        view_events = view_events.filter(user=user)
+    
+    view_counts = view_events.filter(object_id=OuterRef('pk')).order_by().values('object_id').annotate(
+        c=count()
+    ).values('c')
+    
+    return queryset.filter(id__in=view_events.values('object_id')).annotate(
+        view_count=Subquery(view_counts, output_field=IntegerField())
+    ).order_by('-view_count')
+
+
+def attach_view_counts(queryset, ranking):
+    """
+    Load objects of a cached ranking in one query.
+    
+    Args:
+        queryset: Queryset to load objects from
+        ranking: List of (object_id, view_count) pairs, most viewed first
+    
+    Returns:
+        List of objects in ranking order, each with a view_count attribute
+    """
+    objects = queryset.in_bulk([object_id for object_id, _ in ranking])
+    result = []
+    for object_id, view_count in ranking:
+        obj = objects.get(object_id)
+        if obj is not None:
+            obj.view_count = view_count
+            result.append(obj)
+    return result
+
+
+def attach_view_count_rows(queryset, ranking):
+    """
+    Load .values() rows of a cached ranking in one query.
+    
+    Args:
+        queryset: .values() queryset including 'id'
+        ranking: List of (object_id, view_count) pairs, most viewed first
+    
+    Returns:
+        List of row dicts in ranking order, each with a view_count key
+    """
+    rows = {row['id']: row for row in queryset.filter(id__in=[object_id for object_id, _ in ranking])}
+    result = []
+    for object_id, view_count in ranking:
+        row = rows.get(object_id)
+        if row is not None:
+            row['view_count'] = view_count
+            result.append(row)
+    return result
+
+
+def refresh_rollup(since):
+    """
+    Recompute AnalyticsRollup rows from the hour `since` falls in onwards.
+    
+    Buckets in the window are replaced, so running it repeatedly over the same
+    period is safe. Concurrent runs are serialized: on PostgreSQL with a
+    transaction-level advisory lock, on SQLite by its single writer lock.
+    
+    Returns:
+        Number of rollup rows written
+    """
+    bucket_start = truncate_to_hour(since)
+    buckets = AnalyticsEvent.objects.filter(created_at__gte=bucket_start).annotate(
+        bucket_hour=TruncHour('created_at')
+    ).order_by().values(
+        'user_id', 'event_type', 'content_type_id', 'object_id', 'bucket_hour'
+    ).annotate(count=Count('id'))
+    
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [ROLLUP_LOCK_ID])
+        # Under the lock the delete sees rows inserted by a run that just committed
+        AnalyticsRollup.objects.filter(bucket_hour__gte=bucket_start).delete()
+        rollups = AnalyticsRollup.objects.bulk_create(
+            (AnalyticsRollup(**bucket) for bucket in buckets), batch_size=1000
+        )
+    return len(rollups)
+
+
+def start_event_buffer():
+    """Start collecting tracked events for the current request"""
+    _request_events.set([])
+
+
+def flush_event_buffer():
+    """Write events collected for the current request with a single bulk INSERT"""
+    events = _request_events.get()
+    _request_events.set(None)
+    if not events:
+        return
+    try:
+        AnalyticsEvent.objects.bulk_create(events, batch_size=1000)
+    except Exception:
+        logger.exception('Failed to write %d analytics events', len(events))
+
+
+def track_event(user, event_type, content_object=None, metadata=None, request=None, object_ref=None):
     """
     Track an analytics event.
     
@@ -16,16 +216,34 @@ def track_event(user, event_type, content_object=None, metadata=None, request=No
         content_object: Related object (Item, Location, etc.)
         metadata: Additional data (dict)
         request: Django request object (for IP and user agent)
+        object_ref: (model_class, object_id) tuple, used instead of content_object
+                    when the related object has not been loaded
+    
+    Inside a request the event is buffered and written after the response has been
+    produced (see flush_event_buffer); elsewhere it is saved immediately.
+    
+    Nothing is recorded when settings.ANALYTICS_ENABLED is False, or for anonymous
+    events without a related object.
     
     Returns:
-        Created AnalyticsEvent instance
+        AnalyticsEvent instance (not yet saved when buffered), or None if not tracked
     """
-    content_type = None
+    if not getattr(settings, 'ANALYTICS_ENABLED', True):
+        return None
+    
+    is_authenticated = user is not None and user.is_authenticated
+    if not is_authenticated and content_object is None and object_ref is None:
+        return None
+    
+    content_type_id = None
     object_id = None
     
     if content_object:
-        content_type = ContentType.objects.get_for_model(content_object)
+        content_type_id = get_content_type_id(type(content_object))
         object_id = content_object.id
+    elif object_ref:
+        model, object_id = object_ref
+        content_type_id = get_content_type_id(model)
     
     ip_address = None
     user_agent = ''
@@ -33,15 +251,52 @@ def track_event(user, event_type, content_object=None, metadata=None, request=No
         ip_address = request.META.get('REMOTE_ADDR')
         user_agent = request.META.get('HTTP_USER_AGENT', '')
     
-    return AnalyticsEvent.objects.create(
-        user=user if user and user.is_authenticated else None,
+    event = AnalyticsEvent(
+        user=user if is_authenticated else None,
         event_type=event_type,
-        content_type=content_type,
+        content_type_id=content_type_id,
         object_id=object_id,
         metadata=metadata or {},
         ip_address=ip_address,
         user_agent=user_agent,
     )
+    
+    buffered_events = _request_events.get()
+    if buffered_events is None:
+        event.save()
+    else:
+        buffered_events.append(event)
+    return event
+
+
+def rank_popular_items(user=None, days=30, limit=10):
+    """Cached (item_id, view_count) pairs of the most viewed items"""
+    def rank_items():
+        since = timezone.now() - timedelta(days=days)
+        items = annotate_view_counts(
+            Item.objects.all(), 'item_view', ITEM_CONTENT_TYPE.id, since, user=user
+        )
+        return list(items.values_list('id', 'view_count')[:limit])
+    
+    # Only the ranking is cached; objects are always loaded fresh
+    return get_cached_or_set(
+        get_cache_key('stats:popular_items', user, days, limit), rank_items, CACHE_TIMEOUT_MEDIUM
+    )
+
+
+def rank_popular_locations(user=None, days=30, limit=10):
+    """Cached (location_id, view_count) pairs of the most viewed locations"""
+    def rank_locations():
+        since = timezone.now() - timedelta(days=days)
+        locations = annotate_view_counts(
+            Location.objects.all(), 'location_view', LOCATION_CONTENT_TYPE.id, since, user=user
+        )
+        return list(locations.values_list('id', 'view_count')[:limit])
+    
+    # Only the ranking is cached; objects are always loaded fresh
+    return get_cached_or_set(
+        get_cache_key('stats:popular_locations', user, days, limit), rank_locations, CACHE_TIMEOUT_MEDIUM
+    )
 
 
 def get_popular_items(user=None, days=30, limit=10):
@@ -54,47 +309,9 @@ def get_popular_items(user=None, days=30, limit=10):
         limit: Maximum number of items to return
     
     Returns:
-        QuerySet of items ordered by view count
+        List of items ordered by view count, each with a view_count attribute
     """
-    since = timezone.now() - timedelta(days=days)
-    item_content_type = ContentType.objects.get_for_model(Item)
-    
-    # Get item view events
-    view_events = AnalyticsEvent.objects.filter(
-        event_type='item_view',
-        content_type=item_content_type,
-        created_at__gte=since,
-    )
-    
-    if user:
-        view_events = view_events.filter(user=user)
-    
-    # Count views per item
-    item_view_counts = view_events.values('object_id').annotate(
-        view_count=Count('id')
-    ).order_by('-view_count')[:limit]
-    
-    # Get item IDs
-    item_ids = [item['object_id'] for item in item_view_counts]
-    
-    if not item_ids:
-        return []
-    
-    # Get items with view counts
-    items = optimize_item_queryset(Item.objects.filter(id__in=item_ids))
-    
-    # Create a dict to map item IDs to view counts
-    view_count_map = {item['object_id']: item['view_count'] for item in item_view_counts}
-    
-    # Sort items by view count
-    items_list = list(items)
-    items_list.sort(key=lambda x: view_count_map.get(x.id, 0), reverse=True)
-    
-    # Add view_count to each item
-    for item in items_list:
-        item.view_count = view_count_map.get(item.id, 0)
-    
-    return items_list
+    return attach_view_counts(optimize_item_queryset(), rank_popular_items(user, days, limit))
 
 
 def get_popular_locations(user=None, days=30, limit=10):
@@ -107,47 +324,35 @@ def get_popular_locations(user=None, days=30, limit=10):
         limit: Maximum number of locations to return
     
     Returns:
-        QuerySet of locations ordered by view count
+        List of locations ordered by view count, each with a view_count attribute
     """
-    since = timezone.now() - timedelta(days=days)
-    location_content_type = ContentType.objects.get_for_model(Location)
-    
-    # Get location view events
-    view_events = AnalyticsEvent.objects.filter(
-        event_type='location_view',
-        content_type=location_content_type,
-        created_at__gte=since,
-    )
-    
-    if user:
-        view_events = view_events.filter(user=user)
-    
-    # Count views per location
-    location_view_counts = view_events.values('object_id').annotate(
-        view_count=Count('id')
-    ).order_by('-view_count')[:limit]
-    
-    # Get location IDs
-    location_ids = [loc['object_id'] for loc in location_view_counts]
-    
-    if not location_ids:
-        return []
-    
-    # Get locations with view counts
-    locations = optimize_location_queryset(Location.objects.filter(id__in=location_ids))
+    return attach_view_counts(optimize_location_queryset(), rank_popular_locations(user, days, limit))
+
+
+def get_popular_item_rows(queryset, user=None, days=30, limit=10):
+    """
+    Most viewed items as .values() rows (see get_popular_items).
     
-    # Create a dict to map location IDs to view counts
-    view_count_map = {loc['object_id']: loc['view_count'] for loc in location_view_counts}
+    Args:
+        queryset: Item .values() queryset to load rows from
     
-    # Sort locations by view count
-    locations_list = list(locations)
-    locations_list.sort(key=lambda x: view_count_map.get(x.id, 0), reverse=True)
+    Returns:
+        List of row dicts ordered by view count, each with a view_count key
+    """
+    return attach_view_count_rows(queryset, rank_popular_items(user, days, limit))
+
+
+def get_popular_location_rows(queryset, user=None, days=30, limit=10):
+    """
+    Most viewed locations as .values() rows (see get_popular_locations).
     
-    # Add view_count to each location
-    for loc in locations_list:
-        loc.view_count = view_count_map.get(loc.id, 0)
+    Args:
+        queryset: Location .values() queryset to load rows from
     
-    return locations_list
+    Returns:
+        List of row dicts ordered by view count, each with a view_count key
+    """
+    return attach_view_count_rows(queryset, rank_popular_locations(user, days, limit))
 
 
 def get_usage_statistics(user=None, days=30):
@@ -161,53 +366,39 @@ def get_usage_statistics(user=None, days=30):
     Returns:
         Dict with statistics
     """
+    return get_cached_or_set(
+        get_cache_key('stats:usage_statistics', user, days),
+        lambda: compute_usage_statistics(user, days),
+        CACHE_TIMEOUT_MEDIUM,
+    )
+
+
+def compute_usage_statistics(user, days):
+    """Aggregate usage statistics from the database (uncached get_usage_statistics)"""
     since = timezone.now() - timedelta(days=days)
     
-    events = AnalyticsEvent.objects.filter(created_at__gte=since)
+    events, count = counted_events(since)
     if user:
         events = events.filter(user=user)
     
-    # Count events by type
-    event_counts = events.values('event_type').annotate(
-        count=Count('id')
+    # All counters in a single pass over the period
+    stats = events.aggregate(
+        total_events=count(),
+        unique_users=Count('user', distinct=True),
+        unique_items_viewed=Count(
+            'object_id',
+            filter=Q(event_type='item_view', content_type_id=ITEM_CONTENT_TYPE.id),
+            distinct=True,
+        ),
+        unique_locations_viewed=Count(
+            'object_id',
+            filter=Q(event_type='location_view', content_type_id=LOCATION_CONTENT_TYPE.id),
+            distinct=True,
+        ),
+        **event_type_aggregates(count),
     )
-    
-    event_type_map = {item['event_type']: item['count'] for item in event_counts}
-    
-    # Get unique users
-    unique_users = events.filter(user__isnull=False).values('user').distinct().count()
-    
-    # Get unique items viewed
-    item_content_type = ContentType.objects.get_for_model(Item)
-    unique_items = events.filter(
-        event_type='item_view',
-        content_type=item_content_type
-    ).values('object_id').distinct().count()
-    
-    # Get unique locations viewed
-    location_content_type = ContentType.objects.get_for_model(Location)
-    unique_locations = events.filter(
-        event_type='location_view',
-        content_type=location_content_type
-    ).values('object_id').distinct().count()
-    
-    return {
-        'total_events': events.count(),
-        'unique_users': unique_users,
-        'unique_items_viewed': unique_items,
-        'unique_locations_viewed': unique_locations,
-        'item_views': event_type_map.get('item_view', 0),
-        'location_views': event_type_map.get('location_view', 0),
-        'item_searches': event_type_map.get('item_search', 0),
-        'location_searches': event_type_map.get('location_search', 0),
-        'items_created': event_type_map.get('item_created', 0),
-        'items_updated': event_type_map.get('item_updated', 0),
-        'items_deleted': event_type_map.get('item_deleted', 0),
-        'locations_created': event_type_map.get('location_created', 0),
-        'locations_updated': event_type_map.get('location_updated', 0),
-        'locations_deleted': event_type_map.get('location_deleted', 0),
-        'period_days': days,
-    }
+    stats['period_days'] = days
+    return stats
 
 
 def get_user_activity(user, days=30):
@@ -221,31 +412,23 @@ def get_user_activity(user, days=30):
     Returns:
         Dict with user activity statistics
     """
-    since = timezone.now() - timedelta(days=days)
-    
-    events = AnalyticsEvent.objects.filter(user=user, created_at__gte=since)
-    
-    # Count events by type
-    event_counts = events.values('event_type').annotate(
-        count=Count('id')
+    return get_cached_or_set(
+        get_cache_key('stats:user_activity', user, days),
+        lambda: compute_user_activity(user, days),
+        CACHE_TIMEOUT_MEDIUM,
     )
+
+
+def compute_user_activity(user, days):
+    """Aggregate user activity from the database (uncached get_user_activity)"""
+    since = timezone.now() - timedelta(days=days)
     
-    event_type_map = {item['event_type']: item['count'] for item in event_counts}
+    events, count = counted_events(since)
+    events = events.filter(user=user)
     
-    return {
-        'total_events': events.count(),
-        'item_views': event_type_map.get('item_view', 0),
-        'location_views': event_type_map.get('location_view', 0),
-        'item_searches': event_type_map.get('item_search', 0),
-        'location_searches': event_type_map.get('location_search', 0),
-        'items_created': event_type_map.get('item_created', 0),
-        'items_updated': event_type_map.get('item_updated', 0),
-        'items_deleted': event_type_map.get('item_deleted', 0),
-        'locations_created': event_type_map.get('location_created', 0),
-        'locations_updated': event_type_map.get('location_updated', 0),
-        'locations_deleted': event_type_map.get('location_deleted', 0),
-        'period_days': days,
-    }
+    stats = events.aggregate(total_events=count(), **event_type_aggregates(count))
+    stats['period_days'] = days
+    return stats
 
 
 def get_item_analytics(item, days=30):
@@ -260,25 +443,20 @@ def get_item_analytics(item, days=30):
         Dict with item analytics
     """
     since = timezone.now() - timedelta(days=days)
-    item_content_type = ContentType.objects.get_for_model(Item)
     
     events = AnalyticsEvent.objects.filter(
-        content_type=item_content_type,
+        content_type_id=ITEM_CONTENT_TYPE.id,
         object_id=item.id,
         created_at__gte=since,
     )
     
-    view_count = events.filter(event_type='item_view').count()
-    unique_viewers = events.filter(
-        event_type='item_view',
-        user__isnull=False
-    ).values('user').distinct().count()
+    stats = events.aggregate(**view_count_aggregates('item_view'))
     
     return {
         'item_id': str(item.id),
         'item_name': item.name,
-        'total_views': view_count,
-        'unique_viewers': unique_viewers,
+        'total_views': stats['total_views'],
+        'unique_viewers': stats['unique_viewers'],
         'period_days': days,
     }
 
@@ -295,25 +473,20 @@ def get_location_analytics(location, days=30):
         Dict with location analytics
     """
     since = timezone.now() - timedelta(days=days)
-    location_content_type = ContentType.objects.get_for_model(Location)
     
     events = AnalyticsEvent.objects.filter(
-        content_type=location_content_type,
+        content_type_id=LOCATION_CONTENT_TYPE.id,
         object_id=location.id,
         created_at__gte=since,
     )
     
-    view_count = events.filter(event_type='location_view').count()
-    unique_viewers = events.filter(
-        event_type='location_view',
-        user__isnull=False
-    ).values('user').distinct().count()
+    stats = events.aggregate(**view_count_aggregates('location_view'))
     
     return {
         'location_id': str(location.id),
         'location_name': location.name,
-        'total_views': view_count,
-        'unique_viewers': unique_viewers,
+        'total_views': stats['total_views'],
+        'unique_viewers': stats['unique_viewers'],
         'period_days': days,
     }
 
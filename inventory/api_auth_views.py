@@ -6,7 +6,7 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate, get_user_model
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .authentication import create_token, delete_user_token, refresh_token, get_user_token
+from .authentication import get_or_create_token, delete_user_token, refresh_token
 
 
 # Create your models here.
@@ -86,15 +86,13 @@ def obtain_token(request):
         )
     
     # Create or get existing token
-    token = get_user_token(user)
-    if not token:
-        token = create_token(user)
+    token = get_or_create_token(user)
     
     return Response({
         'token': token,
         'user_id': user.id,
         'username': user.username,
-        'email': user.email if hasattr(user, 'email') else None,
+        'email': getattr(user, 'email', None),
     })
 
 
@@ -130,7 +128,6 @@ def revoke_token(request):
         "message": "Token revoked successfully"
     }
     """
-    from .authentication import delete_user_token
     delete_user_token(request.user)
     
     return Response({
@@ -172,9 +169,10 @@ def refresh_token_view(request):
     }
     """
     auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-    token = auth_header.split(' ')[1] if len(auth_header.split(' ')) > 1 else None
+    _, sep, token = auth_header.partition(' ')
+    token = token.strip()
     
-    if not token:
+    if not sep or not token:
         return Response(
             {'error': 'Token not found in request.'},
             status=status.HTTP_400_BAD_REQUEST
@@ -233,9 +231,9 @@ def token_info(request):
     return Response({
         'user_id': request.user.id,
         'username': request.user.username,
-        'email': request.user.email if hasattr(request.user, 'email') else None,
+        'email': getattr(request.user, 'email', None),
         'is_staff': request.user.is_staff,
         'is_superuser': request.user.is_superuser,
-        'authenticated': request.user.is_authenticated,
+        'authenticated': True,
     })
 
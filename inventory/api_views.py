@@ -5,22 +5,129 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.throttling import UserRateThrottle
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models import Prefetch, Count
+from django.db import models, transaction
+from django.db.models import Prefetch
 from django.core.cache import cache
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from functools import partial
+import json
 from .models import Location, Item, ItemLog, Category, Tag, LocationShare, ItemShare, Notification, AnalyticsEvent
-from .utils import get_cached_or_set, get_cache_key, CACHE_TIMEOUT_MEDIUM
+from .utils import (
+    get_cache_key, get_local_cached_or_set, count_subquery,
+    CACHE_KEY_USER, CACHE_TIMEOUT_SHORT, CACHE_TIMEOUT_MEDIUM, CACHE_TIMEOUT_LONG,
+)
 from .serializers import (
     LocationSerializer, LocationDetailSerializer,
     ItemSerializer, ItemDetailSerializer,
     ItemLogSerializer, CategorySerializer, TagSerializer,
-    LocationShareSerializer, ItemShareSerializer, NotificationSerializer
+    LocationShareSerializer, ItemShareSerializer, NotificationSerializer,
+    LOCATION_ROW_FIELDS, ITEM_ROW_FIELDS, ITEMLOG_ROW_FIELDS,
+    serialize_location_rows, serialize_item_rows, serialize_itemlog_rows,
+)
+from .permissions import (
+    IsOwnerOrShared, can_view_location, can_edit_location, can_view_item, can_edit_item,
+    location_access_filter, item_access_filter,
 )
-from .permissions import IsOwnerOrShared, can_view_location, can_edit_location, can_view_item, can_edit_item
+from .pagination import ItemCursorPagination, ItemLogCursorPagination
+from .renderers import ORJSONRenderer
+from .notifications import get_unread_count, invalidate_unread_count
 
 User = get_user_model()
 
+# Share columns read by find_share_role (the FK is needed to attach prefetched shares)
+SHARE_ROLE_FIELDS = {
+    'location': ('id', 'location_id', 'user_id', 'role'),
+    'item': ('id', 'item_id', 'user_id', 'role'),
+}
+
+
+def get_paginated_data(viewset, queryset, serialize_rows, context):
+    """
+    Serialize one page of a .values() queryset for a list or custom @action.
+    
+    Returns the paginated payload (count/next/previous/results), or the full
+    list when the viewset has no paginator.
+    """
+    page = viewset.paginate_queryset(queryset)
+    if page is None:
+        return serialize_rows(list(queryset), context)
+    return viewset.get_paginated_response(serialize_rows(page, context)).data
+
+
+def get_share_roles(user, item_roles=False):
+    """
+    The user's share roles: location_id -> role, plus item_id -> role when item
+    rows are serialized.
+    
+    Cached per user; share signals clear it through invalidate_user_cache().
+    """
+    def load_share_roles():
+        return {
+            'user_location_shares': dict(
+                LocationShare.objects.filter(user=user).values_list('location_id', 'role')
+            ),
+            'user_item_shares': dict(
+                ItemShare.objects.filter(user=user).values_list('item_id', 'role')
+            ),
+        }
+    
+    roles = get_local_cached_or_set(
+        get_cache_key(CACHE_KEY_USER, user, 'share_roles'), load_share_roles, CACHE_TIMEOUT_MEDIUM
+    )
+    if item_roles:
+        return roles
+    return {'user_location_shares': roles['user_location_shares']}
+
+
+def get_rows_context(viewset, item_roles=False):
+    """
+    Serializer context for row payloads, with the user's share roles (see get_share_roles).
+    
+    Model serializers read roles from the prefetched user_shares instead.
+    """
+    context = viewset.get_serializer_context()
+    context.update(get_share_roles(viewset.request.user, item_roles))
+    return context
+
+
+def serialize_ranked_rows(rows, serialize_rows, context):
+    """Row payloads with the view_count of each ranked row"""
+    data = serialize_rows(rows, context)
+    for row_data, row in zip(data, rows):
+        row_data['view_count'] = row['view_count']
+    return data
+
+
+def annotate_location_counts(queryset):
+    """Annotate items_count/children_count serialized for each location"""
+    return queryset.annotate(
+        items_count=count_subquery(Item, 'location'),
+        children_count=count_subquery(Location, 'parent'),
+    )
+
+
+def get_page_number(viewset):
+    """Requested page number of a paginated @action (part of its cache key)"""
+    return viewset.request.query_params.get(viewset.paginator.page_query_param, 1)
+
+
+def get_cached_json_response(request, cache_key, get_data, timeout=CACHE_TIMEOUT_MEDIUM):
+    """
+    Response with the payload of get_data(), cached as rendered JSON bytes.
+    
+    A cache hit is sent as is, without rebuilding or re-encoding the payload;
+    other formats (the browsable API) render the decoded payload.
+    """
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = ORJSONRenderer().render(get_data())
+        cache.set(cache_key, payload, timeout)
+    if request.accepted_renderer.format != 'json':
+        return Response(json.loads(payload))
+    return HttpResponse(payload, content_type='application/json')
+
 
 class LocationViewSet(viewsets.ModelViewSet):
     """
@@ -49,58 +156,42 @@ class LocationViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'room_type', 'created_at']
     ordering = ['name']
     
+    # Actions that serialize the location object itself
+    serializing_actions = ('retrieve', 'update', 'partial_update')
+    
     def get_queryset(self):
         """Filter locations to only show those accessible to the user (optimized)"""
         from .utils import optimize_location_queryset
         
         user = self.request.user
         
+        if user.is_superuser:
+            queryset = Location.objects.all()
+        else:
+            # Locations where user is owner or has shared access
+            queryset = Location.objects.filter(location_access_filter(user))
+        
+        # list reads .values() rows, so only the counters are added
+        if self.action == 'list':
+            return annotate_location_counts(queryset)
+        # items/children/share/unshare/destroy only need the location row itself
+        if self.action not in self.serializing_actions:
+            return queryset
+        
         # Prefetch user's shares for this user to avoid N+1 queries in serializer
         user_shares_prefetch = Prefetch(
             'shares',
-            queryset=LocationShare.objects.filter(user=user).select_related('user', 'created_by'),
+            queryset=LocationShare.objects.filter(user=user).only(*SHARE_ROLE_FIELDS['location']),
             to_attr='user_shares'
         )
-        
-        if user.is_superuser:
-            queryset = Location.objects.all().select_related('parent', 'owner').prefetch_related(
-                user_shares_prefetch,
-                'items',
-                'children'
-            ).annotate(
-                items_count=Count('items', distinct=True),
-                children_count=Count('children', distinct=True)
-            )
-            return optimize_location_queryset(queryset)
-        
-        # Get locations where user is owner or has shared access
-        owned = Location.objects.filter(owner=user)
-        shared = Location.objects.filter(shares__user=user)
-        queryset = (owned | shared).distinct().select_related('parent', 'owner').prefetch_related(
-            user_shares_prefetch,
-            'items',
-            'children'
-        ).annotate(
-            items_count=Count('items', distinct=True),
-            children_count=Count('children', distinct=True)
+        queryset = annotate_location_counts(
+            queryset.select_related('parent', 'owner').prefetch_related(user_shares_prefetch)
         )
-        return optimize_location_queryset(queryset)
-    
-    def get_serializer_context(self):
-        """Add request and cached shares to serializer context"""
-        context = super().get_serializer_context()
-        context['request'] = self.request
         
-        # Pre-cache user's location shares to avoid N+1 queries
-        user = self.request.user
-        if user.is_authenticated:
-            # Get all location shares for this user in one query
-            location_shares = LocationShare.objects.filter(user=user).select_related('user', 'created_by')
-            # Create a dict: location_id -> role
-            user_location_shares = {share.location_id: share.role for share in location_shares}
-            context['user_location_shares'] = user_location_shares
-        
-        return context
+        # Nested items/children/shares are only serialized by LocationDetailSerializer
+        if self.action == 'retrieve':
+            return optimize_location_queryset(queryset)
+        return queryset
     
     def perform_create(self, serializer):
         """Set owner when creating location"""
@@ -111,64 +202,47 @@ class LocationViewSet(viewsets.ModelViewSet):
             return LocationDetailSerializer
         return LocationSerializer
     
+    def list(self, request, *args, **kwargs):
+        """List locations from .values() rows (same payload as LocationSerializer)"""
+        queryset = self.filter_queryset(self.get_queryset()).values(*LOCATION_ROW_FIELDS)
+        context = get_rows_context(self)
+        return Response(get_paginated_data(self, queryset, serialize_location_rows, context))
+    
     @action(detail=True, methods=['get'])
     def items(self, request, pk=None):
-        """Get all items in a location (cached)"""
+        """Get items in a location (paginated, cached)"""
         location = self.get_object()
         if not can_view_location(request.user, location):
             return Response({'detail': 'You do not have permission to view this location.'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
-        # Cache key includes location ID and user ID
-        cache_key = get_cache_key('location:items', location.id, request.user.id)
+        # Cache key includes location ID, user ID and page
+        cache_key = get_cache_key('location:items:json', location.id, request.user.id, get_page_number(self))
         
         def get_items_data():
-            # Use optimized queryset with prefetch
-            items = location.items.select_related(
-                'category', 'owner', 'location__parent', 'location__owner'
-            ).prefetch_related(
-                Prefetch('shares', queryset=ItemShare.objects.filter(user=request.user)),
-                Prefetch('location__shares', queryset=LocationShare.objects.filter(user=request.user)),
-                'tags'
-            ).all()
-            # Use same context as main ViewSet
-            context = self.get_serializer_context()
-            serializer = ItemSerializer(items, many=True, context=context)
-            return serializer.data
-        
-        items_data = get_cached_or_set(cache_key, get_items_data, CACHE_TIMEOUT_MEDIUM)
-        return Response(items_data)
+            items = location.items.values(*ITEM_ROW_FIELDS)
+            context = get_rows_context(self, item_roles=True)
+            return get_paginated_data(self, items, serialize_item_rows, context)
+        
+        return get_cached_json_response(request, cache_key, get_items_data)
     
     @action(detail=True, methods=['get'])
     def children(self, request, pk=None):
-        """Get all child locations (cached)"""
+        """Get child locations (paginated, cached)"""
         location = self.get_object()
         if not can_view_location(request.user, location):
             return Response({'detail': 'You do not have permission to view this location.'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
-        # Cache key includes location ID and user ID
-        cache_key = get_cache_key('location:children', location.id, request.user.id)
+        # Cache key includes location ID, user ID and page
+        cache_key = get_cache_key('location:children:json', location.id, request.user.id, get_page_number(self))
         
         def get_children_data():
-            # Use optimized queryset with prefetch and annotate
-            children = location.children.select_related(
-                'parent', 'owner'
-            ).prefetch_related(
-                Prefetch('shares', queryset=LocationShare.objects.filter(user=request.user)),
-                'items',
-                'children'
-            ).annotate(
-                items_count=Count('items', distinct=True),
-                children_count=Count('children', distinct=True)
-            ).all()
-            # Use same context as main ViewSet
-            context = self.get_serializer_context()
-            serializer = LocationSerializer(children, many=True, context=context)
-            return serializer.data
-        
-        children_data = get_cached_or_set(cache_key, get_children_data, CACHE_TIMEOUT_MEDIUM)
-        return Response(children_data)
+            children = annotate_location_counts(location.children.all()).values(*LOCATION_ROW_FIELDS)
+            context = get_rows_context(self)
+            return get_paginated_data(self, children, serialize_location_rows, context)
+        
+        return get_cached_json_response(request, cache_key, get_children_data)
     
     @action(detail=True, methods=['post'])
     def share(self, request, pk=None):
@@ -192,15 +266,15 @@ class LocationViewSet(viewsets.ModelViewSet):
         if user == request.user:
             return Response({'detail': 'Cannot share with yourself.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        share, created = LocationShare.objects.get_or_create(
+        # One locked lookup, then a single INSERT or role UPDATE (signals still fire).
+        # No select_related: FOR UPDATE cannot lock the nullable side of the created_by join
+        share, created = LocationShare.objects.update_or_create(
             location=location,
             user=user,
-            defaults={'role': role, 'created_by': request.user}
+            defaults={'role': role},
+            create_defaults={'role': role, 'created_by': request.user},
         )
-        
-        if not created:
-            share.role = role
-            share.save()
+        share.user = user
         
         serializer = LocationShareSerializer(share)
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
@@ -249,8 +323,23 @@ class ItemViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['location', 'condition', 'category', 'tags', 'owner']
     search_fields = ['name', 'description']
-    ordering_fields = ['name', 'created_at', 'updated_at', 'quantity']
-    ordering = ['-created_at']
+    # Only columns with an index: other orderings would sort the whole filtered list
+    ordering_fields = ['name', 'created_at', 'updated_at']
+    ordering = ['-created_at', '-id']
+    
+    # Actions paginated with a cursor instead of page numbers
+    cursor_pagination_classes = {
+        'list': ItemCursorPagination,
+        'logs': ItemLogCursorPagination,
+    }
+    
+    @property
+    def paginator(self):
+        """Cursor pagination for the item list and logs; other actions keep page numbers"""
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.cursor_pagination_classes.get(self.action, self.pagination_class)
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
     
     def get_queryset(self):
         """Filter items to only show those accessible to the user (optimized)"""
@@ -261,70 +350,32 @@ class ItemViewSet(viewsets.ModelViewSet):
         # Prefetch user's shares for items and locations to avoid N+1 queries
         user_item_shares_prefetch = Prefetch(
             'shares',
-            queryset=ItemShare.objects.filter(user=user).select_related('user', 'created_by'),
+            queryset=ItemShare.objects.filter(user=user).only(*SHARE_ROLE_FIELDS['item']),
             to_attr='user_shares'
         )
         
         # Prefetch location with user's location shares
         user_location_shares_prefetch = Prefetch(
             'location__shares',
-            queryset=LocationShare.objects.filter(user=user).select_related('user', 'created_by'),
+            queryset=LocationShare.objects.filter(user=user).only(*SHARE_ROLE_FIELDS['location']),
             to_attr='user_location_shares'
         )
         
         if user.is_superuser:
-            queryset = Item.objects.all().select_related(
-                'location__parent',
-                'location__owner',
-                'category',
-                'owner'
-            ).prefetch_related(
-                user_item_shares_prefetch,
-                user_location_shares_prefetch,
-                'tags',
-                'logs__user'
-            )
-            return optimize_item_queryset(queryset)
+            queryset = Item.objects.all()
+        else:
+            # Items the user owns, has a share on, or that are in a shared location
+            queryset = Item.objects.filter(item_access_filter(user))
         
-        # Get items where user is owner or has shared access
-        owned = Item.objects.filter(owner=user)
-        shared_items = Item.objects.filter(shares__user=user)
-        # Items in shared locations
-        shared_locations = Location.objects.filter(shares__user=user)
-        shared_via_location = Item.objects.filter(location__in=shared_locations)
-        
-        queryset = (owned | shared_items | shared_via_location).distinct().select_related(
-            'location__parent',
-            'location__owner',
-            'category',
-            'owner'
-        ).prefetch_related(
+        queryset = queryset.prefetch_related(
             user_item_shares_prefetch,
             user_location_shares_prefetch,
-            'tags',
-            'logs__user'
         )
-        return optimize_item_queryset(queryset)
-    
-    def get_serializer_context(self):
-        """Add request and cached shares to serializer context"""
-        context = super().get_serializer_context()
-        context['request'] = self.request
         
-        # Pre-cache user's item and location shares to avoid N+1 queries
-        user = self.request.user
-        if user.is_authenticated:
-            # Get all item shares for this user in one query
-            item_shares = ItemShare.objects.filter(user=user).select_related('user', 'created_by')
-            user_item_shares = {share.item_id: share.role for share in item_shares}
-            context['user_item_shares'] = user_item_shares
-            
-            # Get all location shares for this user in one query
-            location_shares = LocationShare.objects.filter(user=user).select_related('user', 'created_by')
-            user_location_shares = {share.location_id: share.role for share in location_shares}
-            context['user_location_shares'] = user_location_shares
-        
-        return context
+        # Logs and shares are only serialized by ItemDetailSerializer
+        if self.action == 'retrieve':
+            return optimize_item_queryset(queryset)
+        return queryset.select_related('location', 'category', 'owner').prefetch_related('tags')
     
     def perform_create(self, serializer):
         """Set owner when creating item"""
@@ -342,24 +393,33 @@ class ItemViewSet(viewsets.ModelViewSet):
             return ItemDetailSerializer
         return ItemSerializer
     
+    def list(self, request, *args, **kwargs):
+        """List items from .values() rows (same payload as ItemSerializer)"""
+        queryset = self.filter_queryset(self.get_queryset()).values(*ITEM_ROW_FIELDS)
+        context = get_rows_context(self, item_roles=True)
+        return Response(get_paginated_data(self, queryset, serialize_item_rows, context))
+    
     @action(detail=True, methods=['get'])
     def logs(self, request, pk=None):
-        """Get all logs for an item (cached)"""
+        """Get logs for an item, newest first (cursor-paginated, cached)"""
         item = self.get_object()
         if not can_view_item(request.user, item):
             return Response({'detail': 'You do not have permission to view this item.'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
-        # Cache key includes item ID
-        cache_key = get_cache_key('item:logs', item.id)
+        # Cache key includes item ID and cursor
+        cursor = self.paginator.decode_cursor(request)
+        cache_key = get_cache_key(
+            'item:logs:json', item.id, request.query_params.get(self.paginator.cursor_query_param, 'head')
+        )
+        # Only the first page, and pages read backwards towards it, get new logs
+        timeout = CACHE_TIMEOUT_LONG if cursor and not cursor.reverse else CACHE_TIMEOUT_SHORT
         
         def get_logs_data():
-            logs = item.logs.select_related('user').all().order_by('-timestamp')[:50]
-            serializer = ItemLogSerializer(logs, many=True)
-            return serializer.data
+            logs = item.logs.values(*ITEMLOG_ROW_FIELDS)
+            return get_paginated_data(self, logs, serialize_itemlog_rows, {'request': request})
         
-        logs_data = get_cached_or_set(cache_key, get_logs_data, CACHE_TIMEOUT_MEDIUM)
-        return Response(logs_data)
+        return get_cached_json_response(request, cache_key, get_logs_data, timeout)
     
     @action(detail=True, methods=['post'])
     def share(self, request, pk=None):
@@ -383,15 +443,15 @@ class ItemViewSet(viewsets.ModelViewSet):
         if user == request.user:
             return Response({'detail': 'Cannot share with yourself.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        share, created = ItemShare.objects.get_or_create(
+        # One locked lookup, then a single INSERT or role UPDATE (signals still fire).
+        # No select_related: FOR UPDATE cannot lock the nullable side of the created_by join
+        share, created = ItemShare.objects.update_or_create(
             item=item,
             user=user,
-            defaults={'role': role, 'created_by': request.user}
+            defaults={'role': role},
+            create_defaults={'role': role, 'created_by': request.user},
         )
-        
-        if not created:
-            share.role = role
-            share.save()
+        share.user = user
         
         serializer = ItemShareSerializer(share)
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
@@ -438,14 +498,14 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Optimize queryset with annotate for items_count"""
         return Category.objects.annotate(
-            items_count=Count('items', distinct=True)
-        ).prefetch_related('items__location', 'items__owner', 'items__tags')
+            items_count=count_subquery(Item, 'category')
+        )
     
     @action(detail=True, methods=['get'])
     def items(self, request, pk=None):
         """Get all items in a category"""
         category = self.get_object()
-        items = category.items.all()
+        items = category.items.select_related('location', 'owner').prefetch_related('tags')
         serializer = ItemSerializer(items, many=True)
         return Response(serializer.data)
 
@@ -472,14 +532,14 @@ class TagViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """Optimize queryset with annotate for items_count"""
         return Tag.objects.annotate(
-            items_count=Count('items', distinct=True)
-        ).prefetch_related('items__location', 'items__category', 'items__owner')
+            items_count=count_subquery(Item.tags.through, 'tag')
+        )
     
     @action(detail=True, methods=['get'])
     def items(self, request, pk=None):
         """Get all items with this tag"""
         tag = self.get_object()
-        items = tag.items.all()
+        items = tag.items.select_related('location', 'category', 'owner').prefetch_related('tags')
         serializer = ItemSerializer(items, many=True)
         return Response(serializer.data)
 
@@ -504,11 +564,11 @@ class LocationShareViewSet(viewsets.ModelViewSet):
         
         # Show shares where user is owner of location or created the share
         owned_locations = Location.objects.filter(owner=user)
-        return LocationShare.objects.filter(
+        return self.queryset.filter(
             models.Q(location__in=owned_locations) | 
             models.Q(created_by=user) |
             models.Q(user=user)
-        ).distinct()
+        )
 
 
 class ItemShareViewSet(viewsets.ModelViewSet):
@@ -531,11 +591,11 @@ class ItemShareViewSet(viewsets.ModelViewSet):
         
         # Show shares where user is owner of item or created the share
         owned_items = Item.objects.filter(owner=user)
-        return ItemShare.objects.filter(
+        return self.queryset.filter(
             models.Q(item__in=owned_items) | 
             models.Q(created_by=user) |
             models.Q(user=user)
-        ).distinct()
+        )
 
 
 class ItemLogViewSet(viewsets.ReadOnlyModelViewSet):
@@ -571,6 +631,11 @@ class ItemLogViewSet(viewsets.ReadOnlyModelViewSet):
         
         queryset = ItemLog.objects.filter(item_id__in=accessible_item_ids)
         return optimize_itemlog_queryset(queryset)
+    
+    def list(self, request, *args, **kwargs):
+        """List logs from .values() rows (same payload as ItemLogSerializer)"""
+        queryset = self.filter_queryset(self.get_queryset()).values(*ITEMLOG_ROW_FIELDS)
+        return Response(get_paginated_data(self, queryset, serialize_itemlog_rows, self.get_serializer_context()))
 
 
 class NotificationViewSet(viewsets.ModelViewSet):
@@ -608,19 +673,25 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """Mark a notification as read"""
         notification = self.get_object()
         notification.read = True
+        notification.read_at = timezone.now()
         notification.save()
         return Response({'message': 'Notification marked as read'}, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Mark all notifications as read"""
-        count = Notification.objects.filter(user=request.user, read=False).update(read=True)
+        with transaction.atomic():
+            count = Notification.objects.filter(user=request.user, read=False).update(
+                read=True, read_at=timezone.now()
+            )
+            # Drop the counter once the update is visible to other requests
+            transaction.on_commit(partial(invalidate_unread_count, request.user.id))
         return Response({'message': f'{count} notifications marked as read'}, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        """Get count of unread notifications"""
-        count = Notification.objects.filter(user=request.user, read=False).count()
+        """Get count of unread notifications (cached counter)"""
+        count = get_unread_count(request.user)
         return Response({'unread_count': count}, status=status.HTTP_200_OK)
 
 
@@ -642,32 +713,27 @@ class AnalyticsViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def popular_items(self, request):
         """Get most viewed items"""
-        from .analytics.services import get_popular_items
+        from .analytics.services import get_popular_item_rows
         days = int(request.query_params.get('days', 30))
         limit = int(request.query_params.get('limit', 10))
-        items = get_popular_items(user=request.user, days=days, limit=limit)
-        from .serializers import ItemSerializer
-        serializer = ItemSerializer(items, many=True, context={'request': request})
-        # Add view_count to response
-        data = serializer.data
-        for i, item in enumerate(items):
-            data[i]['view_count'] = getattr(item, 'view_count', 0)
-        return Response(data, status=status.HTTP_200_OK)
+        rows = get_popular_item_rows(
+            Item.objects.values(*ITEM_ROW_FIELDS), user=request.user, days=days, limit=limit
+        )
+        context = {'request': request, **get_share_roles(request.user, item_roles=True)}
+        return Response(serialize_ranked_rows(rows, serialize_item_rows, context), status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['get'])
     def popular_locations(self, request):
         """Get most viewed locations"""
-        from .analytics.services import get_popular_locations
+        from .analytics.services import get_popular_location_rows
         days = int(request.query_params.get('days', 30))
         limit = int(request.query_params.get('limit', 10))
-        locations = get_popular_locations(user=request.user, days=days, limit=limit)
-        from .serializers import LocationSerializer
-        serializer = LocationSerializer(locations, many=True, context={'request': request})
-        # Add view_count to response
-        data = serializer.data
-        for i, loc in enumerate(locations):
-            data[i]['view_count'] = getattr(loc, 'view_count', 0)
-        return Response(data, status=status.HTTP_200_OK)
+        rows = get_popular_location_rows(
+            annotate_location_counts(Location.objects.all()).values(*LOCATION_ROW_FIELDS),
+            user=request.user, days=days, limit=limit,
+        )
+        context = {'request': request, **get_share_roles(request.user)}
+        return Response(serialize_ranked_rows(rows, serialize_location_rows, context), status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['get'])
     def user_activity(self, request):
@@ -681,9 +747,10 @@ class AnalyticsViewSet(viewsets.ViewSet):
     def item_analytics(self, request, item_id=None):
         """Get analytics for a specific item"""
         from .analytics.services import get_item_analytics
-        item = get_object_or_404(Item.objects.all(), id=item_id)
-        if not can_view_item(request.user, item):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        items = Item.objects.only('id', 'name', 'owner_id', 'location_id')
+        if not request.user.is_superuser:
+            items = items.filter(item_access_filter(request.user))
+        item = get_object_or_404(items, id=item_id)
         days = int(request.query_params.get('days', 30))
         analytics = get_item_analytics(item, days=days)
         return Response(analytics, status=status.HTTP_200_OK)
@@ -692,9 +759,10 @@ class AnalyticsViewSet(viewsets.ViewSet):
     def location_analytics(self, request, location_id=None):
         """Get analytics for a specific location"""
         from .analytics.services import get_location_analytics
-        location = get_object_or_404(Location.objects.all(), id=location_id)
-        if not can_view_location(request.user, location):
-            return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+        locations = Location.objects.only('id', 'name', 'owner_id')
+        if not request.user.is_superuser:
+            locations = locations.filter(location_access_filter(request.user))
+        location = get_object_or_404(locations, id=location_id)
         days = int(request.query_params.get('days', 30))
         analytics = get_location_analytics(location, days=days)
         return Response(analytics, status=status.HTTP_200_OK)
@@ -1,6 +1,13 @@
-import secrets
+import os
+import string
+import threading
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from base64 import urlsafe_b64encode
 from datetime import timedelta
 from django.core.cache import cache
+from django.db import router
 from django.utils import timezone
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
@@ -8,18 +15,38 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# User columns read by authentication and permission checks, cached with the token
+AUTH_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
 # Token expiration time (default: 7 days)
 TOKEN_EXPIRATION = timedelta(days=7)
+TOKEN_EXPIRATION_SECONDS = int(TOKEN_EXPIRATION.total_seconds())
 CACHE_KEY_PREFIX = 'api_token:'
 USER_TOKEN_KEY_PREFIX = 'user_token:'
 
+# Accepted token format: generate_token() produces 43 urlsafe base64 characters
+TOKEN_MIN_LENGTH = 16
+TOKEN_MAX_LENGTH = 128
+TOKEN_CHARS = frozenset(string.ascii_letters + string.digits + '-_')
+
+# Recently rejected tokens (per process): token cache key -> expiry (time.monotonic())
+REJECTED_TOKENS_MAX_SIZE = 4096
+REJECTED_TOKEN_TIMEOUT = 60
+_rejected_tokens = OrderedDict()
+_rejected_tokens_lock = threading.Lock()
+
 
 class CacheTokenAuthentication(BaseAuthentication):
     """
     Token authentication using Django cache.
     
-    Tokens are stored in cache with format: 'api_token:{token}'
-    User tokens are stored with format: 'user_token:{user_id}'
+    Tokens are stored in cache with format: 'api_token:{blake2b(token)}' -> identity
+    User tokens are stored with format: 'user_token:{user_id}' -> token
+    
+    The token entry holds the AUTH_USER_FIELDS values of the user (never the
+    password hash), so authenticated requests do not query the users table.
+    Tokens issued before keys were hashed are moved on first use (see
+    migrate_legacy_token()).
     """
     
     def authenticate(self, request):
@@ -35,37 +62,38 @@ class CacheTokenAuthentication(BaseAuthentication):
         
         # Try to extract token
         # Handle formats: "Token <token>", "Bearer <token>", or just "<token>"
-        parts = auth_header.split(' ', 1)
-        
-        if len(parts) == 2:
-            # Has prefix: "Token <token>" or "Bearer <token>"
-            auth_type, token = parts
-            # Accept both 'Token' and 'Bearer' prefixes
-            if auth_type.lower() not in ('token', 'bearer'):
-                return None
-        elif len(parts) == 1:
-            # No prefix, just token
-            token = parts[0]
-        else:
+        prefix = auth_header[:7].lower()
+        if prefix.startswith('token '):
+            token = auth_header[6:].strip()
+        elif prefix == 'bearer ':
+            token = auth_header[7:].strip()
+        elif ' ' in auth_header:
+            # Other schemes (e.g. "Basic ...") are left to other authenticators
             return None
+        else:
+            # No prefix, just token
+            token = auth_header.strip()
         
-        if not token or not token.strip():
+        if not token:
             return None
         
-        token = token.strip()
-        
-        # Get user_id from cache
-        cache_key = f'{CACHE_KEY_PREFIX}{token}'
-        user_id = cache.get(cache_key)
+        # Malformed tokens cannot be in cache: reject them without the lookup
+        if not is_valid_token_format(token):
+            raise AuthenticationFailed('Invalid or expired token.')
         
-        if not user_id:
+        # Repeated invalid tokens are rejected without a cache round trip
+        cache_key = get_token_cache_key(token)
+        if is_rejected_token(cache_key):
             raise AuthenticationFailed('Invalid or expired token.')
         
-        try:
-            user = User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            raise AuthenticationFailed('User not found.')
+        # Get user from cache
+        identity = cache.get(cache_key) or migrate_legacy_token(token)
+        
+        if not identity:
+            remember_rejected_token(cache_key)
+            raise AuthenticationFailed('Invalid or expired token.')
         
+        user = get_identity_user(identity)
         if not user.is_active:
             raise AuthenticationFailed('User account is disabled.')
         
@@ -76,9 +104,85 @@ class CacheTokenAuthentication(BaseAuthentication):
         return 'Token'
 
 
+def is_valid_token_format(token):
+    """Check token length and characters without touching the cache."""
+    return TOKEN_MIN_LENGTH <= len(token) <= TOKEN_MAX_LENGTH and TOKEN_CHARS.issuperset(token)
+
+
+def get_token_cache_key(token):
+    """
+    Cache key for a token: 'api_token:' + 32 hex chars of its BLAKE2b digest.
+    
+    Keys have a fixed width and raw tokens never appear in the cache keyspace.
+    """
+    return CACHE_KEY_PREFIX + blake2b(token.encode(), digest_size=16).hexdigest()
+
+
+def is_rejected_token(cache_key):
+    """Check whether the token was rejected less than REJECTED_TOKEN_TIMEOUT seconds ago."""
+    expires = _rejected_tokens.get(cache_key)
+    if expires is None:
+        return False
+    if expires < time.monotonic():
+        with _rejected_tokens_lock:
+            _rejected_tokens.pop(cache_key, None)
+        return False
+    return True
+
+
+def remember_rejected_token(cache_key):
+    """Remember a token that was not found in cache, evicting the oldest entries."""
+    with _rejected_tokens_lock:
+        _rejected_tokens[cache_key] = time.monotonic() + REJECTED_TOKEN_TIMEOUT
+        _rejected_tokens.move_to_end(cache_key)
+        while len(_rejected_tokens) > REJECTED_TOKENS_MAX_SIZE:
+            _rejected_tokens.popitem(last=False)
+
+
+def get_token_identity(user):
+    """Values of AUTH_USER_FIELDS cached with a token."""
+    return {field: getattr(user, field) for field in AUTH_USER_FIELDS}
+
+
+def get_identity_user(identity):
+    """
+    User instance built from a cached identity without a query.
+    
+    Other fields are deferred: reading one (e.g. email) loads it from the database.
+    """
+    # from_db() expects the values in the model's field order
+    fields = [f.attname for f in User._meta.concrete_fields if f.attname in identity]
+    return User.from_db(router.db_for_read(User), fields, [identity[field] for field in fields])
+
+
+def get_legacy_token_cache_key(token):
+    """Cache key of a token issued before keys were hashed: 'api_token:{token}' -> user_id."""
+    return CACHE_KEY_PREFIX + token
+
+
+def migrate_legacy_token(token):
+    """
+    Move a token issued before keys were hashed to its hashed key.
+    
+    Returns the identity of the token, or None if there is no legacy entry or
+    its user no longer exists. Temporary: remove once pre-hash tokens have expired.
+    """
+    legacy_key = get_legacy_token_cache_key(token)
+    user_id = cache.get(legacy_key)
+    if user_id is None:
+        return None
+    
+    cache.delete(legacy_key)
+    user = User.objects.only(*AUTH_USER_FIELDS).filter(pk=user_id).first()
+    if user is None:
+        return None
+    store_token(token, user)
+    return get_token_identity(user)
+
+
 def generate_token():
-    """Generate a secure random token."""
-    return secrets.token_urlsafe(32)
+    """Generate a secure random token (same format as secrets.token_urlsafe(32))."""
+    return urlsafe_b64encode(os.urandom(32)).rstrip(b'=').decode('ascii')
 
 
 def create_token(user):
@@ -87,49 +191,69 @@ def create_token(user):
     
     Returns the token string.
     """
-    # Delete old token if exists
-    delete_user_token(user)
+    old_token = get_user_token(user)
     
-    # Generate new token
+    # Generate new token (also replaces the user_id -> token mapping)
     token = generate_token()
+    store_token(token, user)
     
-    # Store token -> user_id mapping
-    cache_key = f'{CACHE_KEY_PREFIX}{token}'
-    cache.set(cache_key, user.id, timeout=int(TOKEN_EXPIRATION.total_seconds()))
+    # Delete old token if exists
+    if old_token:
+        cache.delete_many([get_token_cache_key(old_token), get_legacy_token_cache_key(old_token)])
     
-    # Store user_id -> token mapping (for easy deletion)
-    user_token_key = f'{USER_TOKEN_KEY_PREFIX}{user.id}'
-    cache.set(user_token_key, token, timeout=int(TOKEN_EXPIRATION.total_seconds()))
+    return token
+
+
+def get_or_create_token(user):
+    """
+    Return existing token for user or create a new one.
+    
+    Skips the extra old-token lookup of create_token() when the user has no token yet.
+    """
+    token = get_user_token(user)
+    if token:
+        return token
     
+    token = generate_token()
+    store_token(token, user)
     return token
 
 
+def store_token(token, user):
+    """
+    Store token -> identity and user_id -> token mappings in cache.
+    
+    Both entries are written in one set_many() call.
+    """
+    cache.set_many({
+        get_token_cache_key(token): get_token_identity(user),
+        # user_id -> token mapping (for easy deletion)
+        USER_TOKEN_KEY_PREFIX + str(user.pk): token,
+    }, timeout=TOKEN_EXPIRATION_SECONDS)
+
+
 def get_user_token(user):
     """Get token for user if exists."""
-    user_token_key = f'{USER_TOKEN_KEY_PREFIX}{user.id}'
+    user_token_key = USER_TOKEN_KEY_PREFIX + str(user.id)
     return cache.get(user_token_key)
 
 
 def delete_token(token):
     """Delete a token from cache."""
-    cache_key = f'{CACHE_KEY_PREFIX}{token}'
-    user_id = cache.get(cache_key)
+    cache_key = get_token_cache_key(token)
+    identity = cache.get(cache_key) or migrate_legacy_token(token)
     
-    if user_id:
-        cache.delete(cache_key)
-        user_token_key = f'{USER_TOKEN_KEY_PREFIX}{user_id}'
-        cache.delete(user_token_key)
+    if identity:
+        cache.delete_many([cache_key, USER_TOKEN_KEY_PREFIX + str(identity['id'])])
 
 
 def delete_user_token(user):
     """Delete token for a specific user."""
-    user_token_key = f'{USER_TOKEN_KEY_PREFIX}{user.id}'
+    user_token_key = USER_TOKEN_KEY_PREFIX + str(user.id)
     token = cache.get(user_token_key)
     
     if token:
-        cache_key = f'{CACHE_KEY_PREFIX}{token}'
-        cache.delete(cache_key)
-        cache.delete(user_token_key)
+        cache.delete_many([get_token_cache_key(token), get_legacy_token_cache_key(token), user_token_key])
 
 
 def refresh_token(token):
@@ -138,16 +262,24 @@ def refresh_token(token):
     
     Returns True if token was refreshed, False if token doesn't exist.
     """
-    cache_key = f'{CACHE_KEY_PREFIX}{token}'
-    user_id = cache.get(cache_key)
+    identity = cache.get(get_token_cache_key(token)) or migrate_legacy_token(token)
     
-    if not user_id:
+    if not identity:
         return False
     
     # Refresh both cache entries
-    cache.set(cache_key, user_id, timeout=int(TOKEN_EXPIRATION.total_seconds()))
-    user_token_key = f'{USER_TOKEN_KEY_PREFIX}{user_id}'
-    cache.set(user_token_key, token, timeout=int(TOKEN_EXPIRATION.total_seconds()))
+    store_token(token, get_identity_user(identity))
     
     return True
 
+
+def update_user_token(user):
+    """
+    Replace the cached identity of an existing token after the user changed.
+    
+    Called from the User post_save signal so is_active, is_superuser etc.
+    are never served stale from the token entry.
+    """
+    token = get_user_token(user)
+    if token:
+        store_token(token, user)
@@ -1,58 +1,67 @@
 # Choices for inventory models
+from django.db import models
 from django.utils.translation import gettext_lazy as _
 
-ROOM_CHOICES = [
-    ('living_room', _('Living Room')),
-    ('kitchen', _('Kitchen')),
-    ('children_room_a', _("Children's Room A")),
-    ('children_room_n', _("Children's Room N")),
-    ('office', _('Office')),
-    ('attic', _('Attic')),
-]
-
-CONDITION_CHOICES = [
-    ('excellent', _('Excellent')),
-    ('good', _('Good')),
-    ('fair', _('Fair')),
-    ('damaged', _('Damaged')),
-    ('poor', _('Poor')),
-]
-
-ACTION_CHOICES = [
-    ('created', _('Created')),
-    ('updated', _('Updated')),
-    ('moved', _('Moved')),
-    ('deleted', _('Deleted')),
-]
-
-ROLE_CHOICES = [
-    ('owner', _('Owner')),
-    ('editor', _('Editor')),
-    ('viewer', _('Viewer')),
-]
-
-NOTIFICATION_TYPE_CHOICES = [
-    ('item_created', _('Item Created')),
-    ('item_updated', _('Item Updated')),
-    ('item_moved', _('Item Moved')),
-    ('item_deleted', _('Item Deleted')),
-    ('location_shared', _('Location Shared')),
-    ('item_shared', _('Item Shared')),
-    ('location_created', _('Location Created')),
-    ('location_updated', _('Location Updated')),
-    ('share_revoked', _('Share Revoked')),
-]
-
-EVENT_TYPE_CHOICES = [
-    ('item_view', _('Item Viewed')),
-    ('location_view', _('Location Viewed')),
-    ('item_search', _('Item Searched')),
-    ('location_search', _('Location Searched')),
-    ('item_created', _('Item Created')),
-    ('item_updated', _('Item Updated')),
-    ('item_deleted', _('Item Deleted')),
-    ('location_created', _('Location Created')),
-    ('location_updated', _('Location Updated')),
-    ('location_deleted', _('Location Deleted')),
-]
 
+class RoomChoices(models.TextChoices):
+    LIVING_ROOM = 'living_room', _('Living Room')
+    KITCHEN = 'kitchen', _('Kitchen')
+    CHILDREN_ROOM_A = 'children_room_a', _("Children's Room A")
+    CHILDREN_ROOM_N = 'children_room_n', _("Children's Room N")
+    OFFICE = 'office', _('Office')
+    ATTIC = 'attic', _('Attic')
+
+
+class ConditionChoices(models.TextChoices):
+    EXCELLENT = 'excellent', _('Excellent')
+    GOOD = 'good', _('Good')
+    FAIR = 'fair', _('Fair')
+    DAMAGED = 'damaged', _('Damaged')
+    POOR = 'poor', _('Poor')
+
+
+class ActionChoices(models.TextChoices):
+    CREATED = 'created', _('Created')
+    UPDATED = 'updated', _('Updated')
+    MOVED = 'moved', _('Moved')
+    DELETED = 'deleted', _('Deleted')
+
+
+class RoleChoices(models.TextChoices):
+    OWNER = 'owner', _('Owner')
+    EDITOR = 'editor', _('Editor')
+    VIEWER = 'viewer', _('Viewer')
+
+
+class NotificationTypeChoices(models.TextChoices):
+    ITEM_CREATED = 'item_created', _('Item Created')
+    ITEM_UPDATED = 'item_updated', _('Item Updated')
+    ITEM_MOVED = 'item_moved', _('Item Moved')
+    ITEM_DELETED = 'item_deleted', _('Item Deleted')
+    LOCATION_SHARED = 'location_shared', _('Location Shared')
+    ITEM_SHARED = 'item_shared', _('Item Shared')
+    LOCATION_CREATED = 'location_created', _('Location Created')
+    LOCATION_UPDATED = 'location_updated', _('Location Updated')
+    SHARE_REVOKED = 'share_revoked', _('Share Revoked')
+
+
+class EventTypeChoices(models.TextChoices):
+    ITEM_VIEW = 'item_view', _('Item Viewed')
+    LOCATION_VIEW = 'location_view', _('Location Viewed')
+    ITEM_SEARCH = 'item_search', _('Item Searched')
+    LOCATION_SEARCH = 'location_search', _('Location Searched')
+    ITEM_CREATED = 'item_created', _('Item Created')
+    ITEM_UPDATED = 'item_updated', _('Item Updated')
+    ITEM_DELETED = 'item_deleted', _('Item Deleted')
+    LOCATION_CREATED = 'location_created', _('Location Created')
+    LOCATION_UPDATED = 'location_updated', _('Location Updated')
+    LOCATION_DELETED = 'location_deleted', _('Location Deleted')
+
+
+# (value, label) lists, kept for existing imports
+ROOM_CHOICES = RoomChoices.choices
+CONDITION_CHOICES = ConditionChoices.choices
+ACTION_CHOICES = ActionChoices.choices
+ROLE_CHOICES = RoleChoices.choices
+NOTIFICATION_TYPE_CHOICES = NotificationTypeChoices.choices
+EVENT_TYPE_CHOICES = EventTypeChoices.choices
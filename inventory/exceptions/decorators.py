@@ -3,6 +3,7 @@ from functools import wraps
 from django.http import JsonResponse, HttpResponseServerError
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.http import Http404
+from .views import handler404, handler403, handler400, handler500
 
 logger = logging.getLogger(__name__)
 
@@ -21,20 +22,17 @@ def handle_exceptions(view_func):
         try:
             return view_func(request, *args, **kwargs)
         except Http404 as e:
-            logger.warning(f"404 error in {view_func.__name__}: {str(e)}")
-            from inventory.exceptions.views import handler404
+            logger.warning("404 error in %s: %s", view_func.__name__, e)
             return handler404(request, e)
         except PermissionDenied as e:
-            logger.warning(f"403 error in {view_func.__name__}: {str(e)}")
-            from inventory.exceptions.views import handler403
+            logger.warning("403 error in %s: %s", view_func.__name__, e)
             return handler403(request, e)
         except ValidationError as e:
-            logger.warning(f"400 error in {view_func.__name__}: {str(e)}")
-            from inventory.exceptions.views import handler400
+            logger.warning("400 error in %s: %s", view_func.__name__, e)
             return handler400(request, e)
         except Exception as e:
             logger.error(
-                f"Unhandled exception in {view_func.__name__}: {type(e).__name__}: {str(e)}",
+                "Unhandled exception in %s: %s: %s", view_func.__name__, type(e).__name__, e,
                 exc_info=True,
                 extra={
                     'view': view_func.__name__,
@@ -42,7 +40,6 @@ def handle_exceptions(view_func):
                     'user': request.user.username if hasattr(request, 'user') and request.user.is_authenticated else 'anonymous',
                 }
             )
-            from inventory.exceptions.views import handler500
             return handler500(request)
     
     return wrapper
@@ -9,6 +9,66 @@ from .exceptions import InventoryAPIException
 logger = logging.getLogger(__name__)
 
 
+def _handle_inventory_exception(exc):
+    """Response for InventoryAPIException subclasses"""
+    custom_response_data = {
+        'error': {
+            'code': exc.default_code,
+            'message': str(exc.detail) if hasattr(exc, 'detail') else exc.default_detail,
+            'type': type(exc).__name__,
+        }
+    }
+    
+    # Add field errors if available
+    if hasattr(exc, 'detail') and isinstance(exc.detail, dict):
+        custom_response_data['error']['fields'] = exc.detail
+    
+    return Response(custom_response_data, status=exc.status_code)
+
+
+def _handle_not_found(exc):
+    """Response for Django's Http404"""
+    return Response({
+        'error': {
+            'code': 'not_found',
+            'message': 'Resource not found.',
+            'type': 'Http404',
+        }
+    }, status=status.HTTP_404_NOT_FOUND)
+
+
+def _handle_permission_denied(exc):
+    """Response for Django's PermissionDenied"""
+    return Response({
+        'error': {
+            'code': 'permission_denied',
+            'message': 'You do not have permission to perform this action.',
+            'type': 'PermissionDenied',
+        }
+    }, status=status.HTTP_403_FORBIDDEN)
+
+
+def _handle_validation_error(exc):
+    """Response for Django's ValidationError"""
+    return Response({
+        'error': {
+            'code': 'validation_error',
+            'message': 'Validation error occurred.',
+            'type': 'ValidationError',
+            'fields': exc.message_dict if hasattr(exc, 'message_dict') else str(exc),
+        }
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+# Exception class -> response builder, looked up along the exception's MRO
+_EXCEPTION_HANDLERS = {
+    InventoryAPIException: _handle_inventory_exception,
+    Http404: _handle_not_found,
+    PermissionDenied: _handle_permission_denied,
+    DjangoValidationError: _handle_validation_error,
+}
+
+
 def custom_exception_handler(exc, context):
     """
     Custom exception handler that provides consistent error responses.
@@ -38,52 +98,11 @@ def custom_exception_handler(exc, context):
         }
     )
     
-    # Handle custom exceptions
-    if isinstance(exc, InventoryAPIException):
-        custom_response_data = {
-            'error': {
-                'code': exc.default_code,
-                'message': str(exc.detail) if hasattr(exc, 'detail') else exc.default_detail,
-                'type': type(exc).__name__,
-            }
-        }
-        
-        # Add field errors if available
-        if hasattr(exc, 'detail') and isinstance(exc.detail, dict):
-            custom_response_data['error']['fields'] = exc.detail
-        
-        return Response(custom_response_data, status=exc.status_code)
-    
-    # Handle Django's Http404
-    if isinstance(exc, Http404):
-        return Response({
-            'error': {
-                'code': 'not_found',
-                'message': 'Resource not found.',
-                'type': 'Http404',
-            }
-        }, status=status.HTTP_404_NOT_FOUND)
-    
-    # Handle Django's PermissionDenied
-    if isinstance(exc, PermissionDenied):
-        return Response({
-            'error': {
-                'code': 'permission_denied',
-                'message': 'You do not have permission to perform this action.',
-                'type': 'PermissionDenied',
-            }
-        }, status=status.HTTP_403_FORBIDDEN)
-    
-    # Handle Django's ValidationError
-    if isinstance(exc, DjangoValidationError):
-        return Response({
-            'error': {
-                'code': 'validation_error',
-                'message': 'Validation error occurred.',
-                'type': 'ValidationError',
-                'fields': exc.message_dict if hasattr(exc, 'message_dict') else str(exc),
-            }
-        }, status=status.HTTP_400_BAD_REQUEST)
+    # Handle custom and Django exceptions
+    for exc_class in type(exc).__mro__:
+        handler = _EXCEPTION_HANDLERS.get(exc_class)
+        if handler:
+            return handler(exc)
     
     # If response is None, it's an unhandled exception
     if response is None:
@@ -8,7 +8,7 @@ logger = logging.getLogger(__name__)
 def handler404(request, exception):
     """Custom 404 error handler"""
     logger.warning(
-        f"404 error: {request.path}",
+        "404 error: %s", request.path,
         extra={
             'request_path': request.path,
             'user': request.user.username if hasattr(request, 'user') and request.user.is_authenticated else 'anonymous',
@@ -23,7 +23,7 @@ def handler404(request, exception):
 def handler500(request):
     """Custom 500 error handler"""
     logger.error(
-        f"500 error: {request.path}",
+        "500 error: %s", request.path,
         exc_info=True,
         extra={
             'request_path': request.path,
@@ -38,7 +38,7 @@ def handler500(request):
 def handler403(request, exception):
     """Custom 403 error handler"""
     logger.warning(
-        f"403 error: {request.path}",
+        "403 error: %s", request.path,
         extra={
             'request_path': request.path,
             'user': request.user.username if hasattr(request, 'user') and request.user.is_authenticated else 'anonymous',
@@ -52,7 +52,7 @@ def handler403(request, exception):
 def handler400(request, exception):
     """Custom 400 error handler"""
     logger.warning(
-        f"400 error: {request.path}",
+        "400 error: %s", request.path,
         extra={
             'request_path': request.path,
             'user': request.user.username if hasattr(request, 'user') and request.user.is_authenticated else 'anonymous',
@@ -6,6 +6,7 @@ This module contains:
 - Image processing utilities (utils.py)
 """
 from .validators import (
+    validate_image,
     validate_image_size,
     validate_image_format,
     validate_image_dimensions,
@@ -14,14 +15,23 @@ from .utils import (
     resize_image,
     optimize_image,
     get_image_info,
+    resize_stored_image,
+    schedule_image_resize,
+    start_image_queue,
+    flush_image_queue,
 )
 
 __all__ = [
+    'validate_image',
     'validate_image_size',
     'validate_image_format',
     'validate_image_dimensions',
     'resize_image',
     'optimize_image',
     'get_image_info',
+    'resize_stored_image',
+    'schedule_image_resize',
+    'start_image_queue',
+    'flush_image_queue',
 ]
 
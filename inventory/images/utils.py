@@ -1,9 +1,15 @@
+import logging
 import os
+from contextvars import ContextVar
 from io import BytesIO
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.core.files.base import ContentFile
 from PIL import Image
-import sys
+
+logger = logging.getLogger(__name__)
+
+# Stored images to resize once the current response has been sent
+_pending_resizes = ContextVar('pending_image_resizes', default=None)
 
 
 def resize_image(image_field, max_width=None, max_height=None, quality=85):
@@ -32,9 +38,17 @@ def resize_image(image_field, max_width=None, max_height=None, quality=85):
         max_height = getattr(settings, 'IMAGE_MAX_HEIGHT', 1920)
     
     try:
-        # Open the image
+        # Open the image (reads the header only)
         img = Image.open(image_field)
         
+        # Check if resizing is needed
+        original_width, original_height = img.size
+        if original_width <= max_width and original_height <= max_height:
+            return None  # No resizing needed
+        
+        # Let the JPEG decoder scale down by 1/2, 1/4 or 1/8 while decoding
+        img.draft('RGB', (max_width, max_height))
+        
         # Convert RGBA to RGB if necessary (for JPEG)
         if img.mode in ('RGBA', 'LA', 'P'):
             # Create a white background
@@ -46,36 +60,23 @@ def resize_image(image_field, max_width=None, max_height=None, quality=85):
         elif img.mode != 'RGB':
             img = img.convert('RGB')
         
-        # Get original dimensions
-        original_width, original_height = img.size
-        
-        # Check if resizing is needed
-        if original_width <= max_width and original_height <= max_height:
-            return None  # No resizing needed
-        
-        # Calculate new dimensions maintaining aspect ratio
-        ratio = min(max_width / original_width, max_height / original_height)
-        new_width = int(original_width * ratio)
-        new_height = int(original_height * ratio)
-        
-        # Resize the image
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        # Resize the image in place, maintaining aspect ratio
+        img.thumbnail((max_width, max_height), Image.Resampling.BICUBIC)
         
         # Save to BytesIO
         output = BytesIO()
         img.save(output, format='JPEG', quality=quality, optimize=True)
-        output.seek(0)
         
         # Create a new InMemoryUploadedFile
         filename = os.path.splitext(image_field.name)[0] + '.jpg'
-        content_file = ContentFile(output.read())
+        content_file = ContentFile(output.getvalue())
         
         return InMemoryUploadedFile(
             content_file,
             'ImageField',
             filename,
             'image/jpeg',
-            sys.getsizeof(output),
+            content_file.size,
             None
         )
         
@@ -117,25 +118,24 @@ def optimize_image(image_field, quality=85):
         # Save to BytesIO with optimization
         output = BytesIO()
         img.save(output, format='JPEG', quality=quality, optimize=True)
-        output.seek(0)
         
         # Check if optimization actually reduced size
         original_size = image_field.size
-        optimized_size = sys.getsizeof(output)
+        optimized_size = output.getbuffer().nbytes
         
         if optimized_size >= original_size:
             return None  # Optimization didn't help
         
         # Create a new InMemoryUploadedFile
         filename = os.path.splitext(image_field.name)[0] + '.jpg'
-        content_file = ContentFile(output.read())
+        content_file = ContentFile(output.getvalue())
         
         return InMemoryUploadedFile(
             content_file,
             'ImageField',
             filename,
             'image/jpeg',
-            sys.getsizeof(output),
+            optimized_size,
             None
         )
         
@@ -171,3 +171,78 @@ def get_image_info(image_field):
     except Exception:
         return None
 
+
+
+def resize_stored_image(model, pk, field_name='image'):
+    """
+    Resize an already stored image and point the row at the resized file.
+    
+    The row is updated with a queryset update() (no save signals), and only if
+    it still references the original file; the file that is no longer
+    referenced is deleted from storage.
+    
+    Args:
+        model: Model class
+        pk: Primary key of the row
+        field_name: Name of the ImageField
+    
+    Returns:
+        True if the image was replaced with a resized copy
+    """
+    from ..utils import invalidate_item_cache, invalidate_location_cache
+    
+    instance = model.objects.filter(pk=pk).only('pk', field_name).first()
+    if instance is None:
+        return False
+    
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return False
+    
+    original_name = field_file.name
+    with field_file.open('rb'):
+        resized = resize_image(field_file)
+    if resized is None:
+        return False
+    
+    field_file.save(os.path.basename(resized.name), resized, save=False)
+    updated = model.objects.filter(pk=pk, **{field_name: original_name}).update(
+        **{field_name: field_file.name}
+    )
+    # Remove whichever file is not referenced by the row
+    field_file.storage.delete(original_name if updated else field_file.name)
+    
+    if updated:
+        invalidate_item_cache(pk)
+        invalidate_location_cache()
+    return bool(updated)
+
+
+def schedule_image_resize(instance, field_name='image'):
+    """
+    Resize a saved instance's image after the current response has been sent.
+    
+    Inside a request the resize is queued (see flush_image_queue); elsewhere
+    it runs immediately.
+    """
+    pending = _pending_resizes.get()
+    if pending is None:
+        resize_stored_image(type(instance), instance.pk, field_name)
+    else:
+        pending.append((type(instance), instance.pk, field_name))
+
+
+def start_image_queue():
+    """Start collecting image resizes for the current request"""
+    _pending_resizes.set([])
+
+
+def flush_image_queue():
+    """Resize images queued during the current request"""
+    pending = _pending_resizes.get()
+    _pending_resizes.set(None)
+    for model, pk, field_name in pending or ():
+        try:
+            resize_stored_image(model, pk, field_name)
+        except Exception:
+            logger.exception('Failed to resize %s image of %s %s', field_name, model.__name__, pk)
@@ -1,10 +1,121 @@
 import os
+from contextlib import contextmanager
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from PIL import Image
 
 
+@contextmanager
+def preserve_file_position(value):
+    """
+    Read a file from the beginning and restore its position afterwards.
+    
+    Args:
+        value: File-like object (ImageField file)
+    """
+    position = value.tell()
+    value.seek(0)
+    try:
+        yield value
+    finally:
+        value.seek(position)
+
+
+def check_image_size(value):
+    """Raise ValidationError if the file is larger than MAX_IMAGE_SIZE."""
+    # Get max size from settings (default: 5MB)
+    max_size = getattr(settings, 'MAX_IMAGE_SIZE', 5 * 1024 * 1024)  # 5MB in bytes
+    
+    if value.size > max_size:
+        max_size_mb = max_size / (1024 * 1024)
+        raise ValidationError(
+            _('Image file too large. Maximum size is %(max_size)s MB.') % {'max_size': max_size_mb}
+        )
+
+
+def check_image_format(image):
+    """Raise ValidationError if the opened image is not in ALLOWED_IMAGE_FORMATS."""
+    # Get allowed formats from settings
+    allowed_formats = getattr(settings, 'ALLOWED_IMAGE_FORMATS', ['JPEG', 'PNG', 'GIF', 'WEBP'])
+    
+    if image.format not in allowed_formats:
+        raise ValidationError(
+            _('Invalid image format. Allowed formats: %(formats)s.') % {
+                'formats': ', '.join(allowed_formats)
+            }
+        )
+
+
+def check_image_dimensions(image):
+    """Raise ValidationError if the opened image is outside the configured dimensions."""
+    # Get max dimensions from settings
+    max_width = getattr(settings, 'MAX_IMAGE_WIDTH', 4096)
+    max_height = getattr(settings, 'MAX_IMAGE_HEIGHT', 4096)
+    min_width = getattr(settings, 'MIN_IMAGE_WIDTH', 1)
+    min_height = getattr(settings, 'MIN_IMAGE_HEIGHT', 1)
+    
+    width, height = image.size
+    
+    if width > max_width or height > max_height:
+        raise ValidationError(
+            _('Image dimensions too large. Maximum size: %(max_width)s x %(max_height)s pixels.') % {
+                'max_width': max_width,
+                'max_height': max_height
+            }
+        )
+    
+    if width < min_width or height < min_height:
+        raise ValidationError(
+            _('Image dimensions too small. Minimum size: %(min_width)s x %(min_height)s pixels.') % {
+                'min_width': min_width,
+                'min_height': min_height
+            }
+        )
+
+
+@contextmanager
+def open_image(value, error_message):
+    """
+    Open an image file for validation.
+    
+    Any error other than ValidationError while opening or reading the image
+    is reported as ValidationError(error_message). The file position is
+    restored afterwards.
+    """
+    with preserve_file_position(value):
+        try:
+            yield Image.open(value)
+        except ValidationError:
+            raise
+        except Exception:
+            raise ValidationError(error_message)
+
+
+def validate_image(value):
+    """
+    Validate image file size, format, dimensions and content with a single open.
+    
+    Content is checked with Image.verify(), which parses the file structure
+    (chunk CRCs for PNG) without decoding pixels; it leaves the image object
+    unusable, so open the file again if the pixels are needed.
+    
+    Args:
+        value: ImageField file
+    
+    Raises:
+        ValidationError: On the first failed check
+    """
+    if value:
+        check_image_size(value)
+        
+        with open_image(value, _('Invalid image file. Please upload a valid image.')) as image:
+            check_image_format(image)
+            check_image_dimensions(image)
+            # Verify it's actually an image without decoding the pixel data
+            image.verify()
+
+
 def validate_image_size(value):
     """
     Validate that image file size is within limits.
@@ -16,20 +127,16 @@ def validate_image_size(value):
         ValidationError: If file size exceeds maximum allowed size
     """
     if value:
-        # Get max size from settings (default: 5MB)
-        max_size = getattr(settings, 'MAX_IMAGE_SIZE', 5 * 1024 * 1024)  # 5MB in bytes
-        
-        if value.size > max_size:
-            max_size_mb = max_size / (1024 * 1024)
-            raise ValidationError(
-                _('Image file too large. Maximum size is %(max_size)s MB.') % {'max_size': max_size_mb}
-            )
+        check_image_size(value)
 
 
 def validate_image_format(value):
     """
     Validate that uploaded file is a valid image format.
     
+    Uses Image.verify() instead of decoding the image; the opened image is
+    discarded afterwards.
+    
     Args:
         value: ImageField file
     
@@ -37,41 +144,10 @@ def validate_image_format(value):
         ValidationError: If file is not a valid image format
     """
     if value:
-        # Get allowed formats from settings
-        allowed_formats = getattr(settings, 'ALLOWED_IMAGE_FORMATS', ['JPEG', 'PNG', 'GIF', 'WEBP'])
-        
-        try:
-            # Reset file pointer to beginning
-            value.seek(0)
-            
-            # Open image to verify format
-            image = Image.open(value)
-            format_name = image.format
-            
-            if format_name not in allowed_formats:
-                raise ValidationError(
-                    _('Invalid image format. Allowed formats: %(formats)s.') % {
-                        'formats': ', '.join(allowed_formats)
-                    }
-                )
-            
-            # Verify it's actually an image by trying to load it
-            image.load()
-            
-            # Reset file pointer after validation
-            value.seek(0)
-            
-        except Exception as e:
-            if isinstance(e, ValidationError):
-                raise
-            # Reset file pointer on error
-            try:
-                value.seek(0)
-            except:
-                pass
-            raise ValidationError(
-                _('Invalid image file. Please upload a valid image.')
-            )
+        with open_image(value, _('Invalid image file. Please upload a valid image.')) as image:
+            check_image_format(image)
+            # Verify it's actually an image without decoding the pixel data
+            image.verify()
 
 
 def validate_image_dimensions(value):
@@ -85,50 +161,6 @@ def validate_image_dimensions(value):
         ValidationError: If image dimensions exceed maximum allowed
     """
     if value:
-        # Get max dimensions from settings
-        max_width = getattr(settings, 'MAX_IMAGE_WIDTH', 4096)
-        max_height = getattr(settings, 'MAX_IMAGE_HEIGHT', 4096)
-        min_width = getattr(settings, 'MIN_IMAGE_WIDTH', 1)
-        min_height = getattr(settings, 'MIN_IMAGE_HEIGHT', 1)
-        
-        try:
-            # Reset file pointer to beginning
-            value.seek(0)
-            
-            image = Image.open(value)
-            width, height = image.size
-            
-            if width > max_width or height > max_height:
-                value.seek(0)  # Reset before raising error
-                raise ValidationError(
-                    _('Image dimensions too large. Maximum size: %(max_width)s x %(max_height)s pixels.') % {
-                        'max_width': max_width,
-                        'max_height': max_height
-                    }
-                )
-            
-            if width < min_width or height < min_height:
-                value.seek(0)  # Reset before raising error
-                raise ValidationError(
-                    _('Image dimensions too small. Minimum size: %(min_width)s x %(min_height)s pixels.') % {
-                        'min_width': min_width,
-                        'min_height': min_height
-                    }
-                )
-            
-            # Reset file pointer after validation
-            value.seek(0)
-                
-        except Exception as e:
-            if isinstance(e, ValidationError):
-                raise
-            # Reset file pointer on error
-            try:
-                value.seek(0)
-            except:
-                pass
-            # If we can't read dimensions, it's not a valid image
-            raise ValidationError(
-                _('Could not read image dimensions. Please upload a valid image.')
-            )
-
+        # If we can't read dimensions, it's not a valid image
+        with open_image(value, _('Could not read image dimensions. Please upload a valid image.')) as image:
+            check_image_dimensions(image)
@@ -1,7 +1,10 @@
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 from django.utils import timezone
 from inventory.models import Location, Item, ItemLog, Category, Tag
-from inventory.choices import ROOM_CHOICES
+from inventory.choices import RoomChoices
+from inventory.utils import invalidate_location_cache, invalidate_item_cache
+from services.qr_service import generate_qr_for_box
 import random
 
 
@@ -14,18 +17,36 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear existing data before generating new data',
         )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Random seed for reproducible test data',
+        )
 
+    @transaction.atomic
     def handle(self, *args, **options):
         if options['clear']:
             self.stdout.write(self.style.WARNING('Clearing existing data...'))
-            ItemLog.objects.all().delete()
-            Item.objects.all().delete()
-            Tag.objects.all().delete()
-            Category.objects.all().delete()
-            Location.objects.all().delete()
+            if connection.vendor == 'postgresql':
+                # CASCADE also empties tables referencing these (item/location shares),
+                # as the ORM cascade delete does
+                tables = ', '.join(
+                    connection.ops.quote_name(model._meta.db_table)
+                    for model in (ItemLog, Item.tags.through, Item, Tag, Category, Location)
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(f'TRUNCATE {tables} CASCADE')
+            else:
+                ItemLog.objects.all().delete()
+                Item.objects.all().delete()
+                Tag.objects.all().delete()
+                Category.objects.all().delete()
+                Location.objects.all().delete()
             self.stdout.write(self.style.SUCCESS('Data cleared.'))
 
         self.stdout.write('Generating test data...')
+        rnd = random.Random(options['seed'])
 
         # Create categories
         categories_data = [
@@ -39,16 +60,11 @@ class Command(BaseCommand):
             ('Tools', 'Tools and hardware', '#30cfd0', '🔧'),
         ]
         
-        categories = {}
-        for name, description, color, icon in categories_data:
-            category = Category.objects.create(
-                name=name,
-                description=description,
-                color=color,
-                icon=icon
-            )
-            categories[name] = category
-            self.stdout.write(f'Created category: {category.name}')
+        categories = {
+            name: Category(name=name, description=description, color=color, icon=icon)
+            for name, description, color, icon in categories_data
+        }
+        Category.objects.bulk_create(categories.values())
 
         # Create tags
         tags_data = [
@@ -62,17 +78,13 @@ class Command(BaseCommand):
             ('Donate', '#e83e8c'),
         ]
         
-        tags = {}
-        for name, color in tags_data:
-            tag = Tag.objects.create(name=name, color=color)
-            tags[name] = tag
-            self.stdout.write(f'Created tag: {tag.name}')
+        tags = {name: Tag(name=name, color=color) for name, color in tags_data}
+        Tag.objects.bulk_create(tags.values())
 
         # Room types
-        room_types = [choice[0] for choice in ROOM_CHOICES]
+        room_types = RoomChoices.values
 
         # Generate main locations (rooms)
-        rooms = {}
         room_names = {
             'living_room': 'Living Room',
             'kitchen': 'Kitchen',
@@ -82,17 +94,12 @@ class Command(BaseCommand):
             'attic': 'Attic',
         }
 
-        for room_type in room_types:
-            room = Location.objects.create(
-                name=room_names[room_type],
-                room_type=room_type,
-                is_box=False
-            )
-            rooms[room_type] = room
-            self.stdout.write(f'Created room: {room.name}')
+        rooms = {
+            room_type: Location(name=room_names[room_type], room_type=room_type, is_box=False)
+            for room_type in room_types
+        }
 
         # Generate boxes in different rooms
-        boxes = []
         box_data = [
             ('Box 1 - Electronics', 'living_room'),
             ('Box 2 - Books', 'living_room'),
@@ -103,18 +110,15 @@ class Command(BaseCommand):
             ('Box 7 - Old Items', 'attic'),
             ('Box 8 - Tools', 'attic'),
         ]
-
-        for box_name, room_type in box_data:
-            box = Location.objects.create(
-                name=box_name,
-                parent=rooms[room_type],
-                is_box=True
-            )
-            boxes.append(box)
-            self.stdout.write(f'Created box: {box.name}')
+        boxes = [
+            Location(name=box_name, parent=rooms[room_type], is_box=True)
+            for box_name, room_type in box_data
+        ]
+        # bulk_create() skips Location.save(), which generates box QR codes
+        for box in boxes:
+            generate_qr_for_box(box)
 
         # Generate sub-locations (shelves, cabinets, etc.)
-        sub_locations = []
         sub_location_data = [
             ('Top Shelf', 'living_room'),
             ('Bottom Shelf', 'living_room'),
@@ -123,15 +127,16 @@ class Command(BaseCommand):
             ('Desk Drawer', 'office'),
             ('Wardrobe', 'children_room_a'),
         ]
+        sub_locations = [
+            Location(name=sub_name, parent=rooms[room_type], is_box=False)
+            for sub_name, room_type in sub_location_data
+        ]
 
-        for sub_name, room_type in sub_location_data:
-            sub = Location.objects.create(
-                name=sub_name,
-                parent=rooms[room_type],
-                is_box=False
-            )
-            sub_locations.append(sub)
-            self.stdout.write(f'Created sub-location: {sub.name}')
+        # Rooms first, then the boxes/sub-locations referencing them
+        Location.objects.bulk_create(rooms.values(), batch_size=500)
+        Location.objects.bulk_create(boxes + sub_locations, batch_size=500)
+        # bulk_create() sends no post_save signals
+        transaction.on_commit(invalidate_location_cache)
 
         # Sample items data with categories and tags
         items_data = [
@@ -182,7 +187,9 @@ class Command(BaseCommand):
 
         # Generate items
         items = []
+        items_tags = []
         conditions = ['good', 'fair', 'damaged', 'excellent']
+        location_pool = ['room', 'box', 'sub']
         
         for item_data in items_data:
             if len(item_data) == 5:
@@ -197,48 +204,79 @@ class Command(BaseCommand):
                 item_tags = [tags[tag_name] for tag_name in tag_names if tag_name in tags]
             
             # Randomly assign to room, box, or sub-location
-            location_choice = random.choice(['room', 'box', 'sub'])
+            location_choice = rnd.choice(location_pool)
             
             if location_choice == 'box' and boxes:
-                location = random.choice(boxes)
+                location = rnd.choice(boxes)
             elif location_choice == 'sub' and sub_locations:
-                location = random.choice(sub_locations)
+                location = rnd.choice(sub_locations)
             else:
                 location = rooms[room_type]
             
-            item = Item.objects.create(
+            items.append(Item(
                 name=name,
                 description=description,
                 quantity=quantity,
                 condition=condition,
                 location=location,
                 category=category
+            ))
+            items_tags.append(item_tags)
+
+        Item.objects.bulk_create(items, batch_size=1000)
+
+        # bulk_create() skips the post_save handler that logs item creation
+        logs = [
+            ItemLog(
+                item=item,
+                action='created',
+                details=f'Item "{item.name}" was created in {item.location.name}'
             )
-            
+            for item in items
+        ]
+
+        item_tag_links = []
+        actions = ['created', 'moved', 'updated']
+        for item, item_tags in zip(items, items_tags):
             # Add tags
-            if item_tags:
-                item.tags.set(item_tags)
-            
-            items.append(item)
+            item_tag_links.extend(
+                Item.tags.through(item_id=item.pk, tag_id=tag.pk) for tag in item_tags
+            )
             
             # Create logs for some items
-            if random.random() > 0.5:  # 50% chance
-                actions = ['created', 'moved', 'updated']
-                action = random.choice(actions)
+            if rnd.random() > 0.5:  # 50% chance
+                action = rnd.choice(actions)
                 details = f'Item {action}'
                 
-                ItemLog.objects.create(
+                logs.append(ItemLog(
                     item=item,
                     action=action,
                     details=details
-                )
+                ))
+
+        Item.tags.through.objects.bulk_create(item_tag_links, batch_size=1000)
+        ItemLog.objects.bulk_create(logs, batch_size=1000)
+        transaction.on_commit(invalidate_item_cache)
+
+        # Per-object output only with -v 2
+        if options['verbosity'] >= 2:
+            created = (
+                ('category', categories.values()),
+                ('tag', tags.values()),
+                ('room', rooms.values()),
+                ('box', boxes),
+                ('sub-location', sub_locations),
+            )
+            for label, objects in created:
+                for obj in objects:
+                    self.stdout.write(f'Created {label}: {obj.name}')
 
         self.stdout.write(self.style.SUCCESS(
             f'\nSuccessfully generated test data:\n'
-            f'  - {Location.objects.count()} locations\n'
-            f'  - {Category.objects.count()} categories\n'
-            f'  - {Tag.objects.count()} tags\n'
-            f'  - {Item.objects.count()} items\n'
-            f'  - {ItemLog.objects.count()} logs'
+            f'  - {len(rooms) + len(boxes) + len(sub_locations)} locations\n'
+            f'  - {len(categories)} categories\n'
+            f'  - {len(tags)} tags\n'
+            f'  - {len(items)} items\n'
+            f'  - {len(logs)} logs'
         ))
 
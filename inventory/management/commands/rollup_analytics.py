@@ -0,0 +1,21 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from inventory.analytics.services import refresh_rollup
+
+
+class Command(BaseCommand):
+    help = 'Refresh hourly analytics rollups used when ANALYTICS_USE_ROLLUP is enabled'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=2,
+            help='Number of recent hours to recompute (default: 2)',
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours'])
+        count = refresh_rollup(since)
+        self.stdout.write(self.style.SUCCESS(f'Refreshed analytics rollups: {count} rows.'))
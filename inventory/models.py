@@ -4,8 +4,8 @@ from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 from services.qr_service import generate_qr_for_box
-from .choices import ROOM_CHOICES, CONDITION_CHOICES, ACTION_CHOICES, ROLE_CHOICES, NOTIFICATION_TYPE_CHOICES, EVENT_TYPE_CHOICES
-from .images import validate_image_size, validate_image_format, validate_image_dimensions, resize_image
+from .choices import RoomChoices, ConditionChoices, ActionChoices, RoleChoices, NotificationTypeChoices, EventTypeChoices
+from .images import validate_image, schedule_image_resize
 
 User = get_user_model()
 
@@ -54,7 +54,7 @@ class Tag(models.Model):
 class Location(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
-    room_type = models.CharField(max_length=50, choices=ROOM_CHOICES, null=True, blank=True, verbose_name=_('Room Type'))
+    room_type = models.CharField(max_length=50, choices=RoomChoices.choices, null=True, blank=True, verbose_name=_('Room Type'))
     parent = models.ForeignKey('self', null=True, blank=True, related_name='children', on_delete=models.CASCADE, verbose_name=_('Parent'))
     is_box = models.BooleanField(default=False)
     qr_code = models.ImageField(upload_to='qr/', null=True, blank=True)
@@ -77,6 +77,7 @@ class Location(models.Model):
         verbose_name_plural = _('Locations')
         ordering = ['name']
         indexes = [
+            models.Index(fields=['name']),  # Default ordering and ?ordering=name
             models.Index(fields=['room_type']),
             models.Index(fields=['is_box']),
             models.Index(fields=['parent']),
@@ -91,7 +92,7 @@ class LocationShare(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     location = models.ForeignKey('Location', related_name='shares', on_delete=models.CASCADE)
     user = models.ForeignKey(User, related_name='shared_locations', on_delete=models.CASCADE)
-    role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='viewer')
+    role = models.CharField(max_length=20, choices=RoleChoices.choices, default='viewer')
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, related_name='created_location_shares', on_delete=models.SET_NULL, null=True)
 
@@ -115,7 +116,7 @@ class Item(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     quantity = models.PositiveIntegerField(default=1)
-    condition = models.CharField(max_length=50, choices=CONDITION_CHOICES, default='good')
+    condition = models.CharField(max_length=50, choices=ConditionChoices.choices, default='good')
     location = models.ForeignKey(Location, related_name='items', on_delete=models.SET_NULL, null=True, blank=True)
     category = models.ForeignKey(Category, related_name='items', on_delete=models.SET_NULL, null=True, blank=True)
     tags = models.ManyToManyField(Tag, related_name='items', blank=True)
@@ -124,7 +125,7 @@ class Item(models.Model):
         upload_to='items/',
         null=True,
         blank=True,
-        validators=[validate_image_size, validate_image_format, validate_image_dimensions],
+        validators=[validate_image],
         help_text=_('Upload an image (JPEG, PNG, GIF, WEBP). Maximum size: 5MB.')
     )
     created_at = models.DateTimeField(auto_now_add=True)
@@ -136,27 +137,21 @@ class Item(models.Model):
             raise ValidationError({'quantity': _('Quantity must be greater than 0')})
         if self.quantity > 10000:
             raise ValidationError({'quantity': _('Quantity is too large (max 10000)')})
-        
-        # Validate image if provided
-        if self.image:
-            validate_image_size(self.image)
-            validate_image_format(self.image)
-            validate_image_dimensions(self.image)
+        # image is checked by its field validator (validate_image) in clean_fields()
     
     def save(self, *args, **kwargs):
         """Override save to call clean validation and resize image"""
         # Validate before saving
         self.full_clean()
         
-        # Resize image if needed
-        if self.image:
-            # Check if image was changed (new upload or update)
-            if not self.pk or (hasattr(self, '_image_changed') and self._image_changed):
-                resized_image = resize_image(self.image)
-                if resized_image:
-                    self.image = resized_image
+        # New upload (not yet written to storage)
+        image_uploaded = bool(self.image) and not self.image._committed
         
         super().save(*args, **kwargs)
+        
+        # Resize the stored image after the response has been sent
+        if image_uploaded:
+            schedule_image_resize(self)
 
     def __str__(self):
         return self.name
@@ -166,15 +161,17 @@ class Item(models.Model):
         verbose_name_plural = _('Items')
         ordering = ['-created_at', 'name']
         indexes = [
+            models.Index(fields=['name']),  # ?ordering=name
             models.Index(fields=['location']),
             models.Index(fields=['condition']),
             models.Index(fields=['category']),
             models.Index(fields=['owner']),
-            models.Index(fields=['created_at']),
+            models.Index(fields=['created_at', 'id']),  # Keyset pagination of the item list
             models.Index(fields=['updated_at']),
             models.Index(fields=['location', 'condition']),  # Composite index for filtering
             models.Index(fields=['category', 'condition']),  # Composite index for filtering
             models.Index(fields=['owner', 'created_at']),  # Composite index for user's items
+            models.Index(fields=['location', '-created_at']),  # Composite index for location's newest items
         ]
 
 class ItemShare(models.Model):
@@ -182,7 +179,7 @@ class ItemShare(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     item = models.ForeignKey('Item', related_name='shares', on_delete=models.CASCADE)
     user = models.ForeignKey(User, related_name='shared_items', on_delete=models.CASCADE)
-    role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='viewer')
+    role = models.CharField(max_length=20, choices=RoleChoices.choices, default='viewer')
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(User, related_name='created_item_shares', on_delete=models.SET_NULL, null=True)
 
@@ -204,7 +201,7 @@ class ItemShare(models.Model):
 class ItemLog(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     item = models.ForeignKey(Item, related_name='logs', on_delete=models.CASCADE)
-    action = models.CharField(max_length=50, choices=ACTION_CHOICES)
+    action = models.CharField(max_length=50, choices=ActionChoices.choices)
     details = models.TextField(blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(User, related_name='item_logs', on_delete=models.SET_NULL, null=True, blank=True)
@@ -221,7 +218,7 @@ class ItemLog(models.Model):
             models.Index(fields=['action']),
             models.Index(fields=['user']),
             models.Index(fields=['timestamp']),
-            models.Index(fields=['item', 'timestamp']),  # Composite index for item logs
+            models.Index(fields=['item', 'timestamp', 'id']),  # Composite index for item logs (keyset pagination)
             models.Index(fields=['action', 'timestamp']),  # Composite index for filtering
         ]
 
@@ -230,9 +227,10 @@ class Notification(models.Model):
     """Model for user notifications"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, related_name='notifications', on_delete=models.CASCADE)
-    notification_type = models.CharField(max_length=50, choices=NOTIFICATION_TYPE_CHOICES)
+    notification_type = models.CharField(max_length=50, choices=NotificationTypeChoices.choices)
     message = models.TextField()
     read = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True, help_text=_('When the notification was marked as read'))
     created_at = models.DateTimeField(auto_now_add=True)
     
     # Generic foreign key fields for related objects
@@ -268,7 +266,7 @@ class AnalyticsEvent(models.Model):
     """Model to track analytics events (views, searches, actions)"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='analytics_events', null=True, blank=True)
-    event_type = models.CharField(max_length=50, choices=EVENT_TYPE_CHOICES)
+    event_type = models.CharField(max_length=50, choices=EventTypeChoices.choices)
     content_type = models.ForeignKey('contenttypes.ContentType', on_delete=models.CASCADE, null=True, blank=True)
     object_id = models.UUIDField(null=True, blank=True)
     metadata = models.JSONField(default=dict, blank=True, help_text=_('Additional event data (search query, filters, etc.)'))
@@ -285,8 +283,41 @@ class AnalyticsEvent(models.Model):
             models.Index(fields=['user', 'event_type', 'created_at']),
             models.Index(fields=['content_type', 'object_id']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['event_type', 'content_type', 'created_at', 'object_id']),  # Covering index for popular items/locations
+            models.Index(fields=['user', 'created_at']),  # Composite index for user activity
         ]
 
     def __str__(self):
         user_str = self.user.username if self.user else 'Anonymous'
         return f"{user_str} - {self.get_event_type_display()} - {self.created_at}"
+
+
+class AnalyticsRollup(models.Model):
+    """Hourly pre-aggregated AnalyticsEvent counts (refreshed by the rollup_analytics command)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='analytics_rollups', null=True, blank=True)
+    event_type = models.CharField(max_length=50, choices=EventTypeChoices.choices)
+    content_type = models.ForeignKey('contenttypes.ContentType', on_delete=models.CASCADE, null=True, blank=True)
+    object_id = models.UUIDField(null=True, blank=True)
+    bucket_hour = models.DateTimeField(help_text=_('Start of the hour the events belong to'))
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Analytics Rollup')
+        verbose_name_plural = _('Analytics Rollups')
+        ordering = ['-bucket_hour']
+        indexes = [
+            models.Index(fields=['bucket_hour']),
+            models.Index(fields=['event_type', 'content_type', 'bucket_hour', 'object_id']),  # Covering index for popular items/locations
+            models.Index(fields=['user', 'bucket_hour']),  # Composite index for user activity
+        ]
+        constraints = [
+            # One row per bucket (rows with a NULL user or object are kept unique by refresh_rollup)
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id', 'event_type', 'user', 'bucket_hour'],
+                name='unique_analytics_rollup_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_event_type_display()} - {self.bucket_hour}: {self.count}"
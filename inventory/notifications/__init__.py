@@ -13,6 +13,9 @@ from .services import (
     notify_location_shared,
     notify_item_shared,
     notify_share_revoked,
+    get_unread_count,
+    increment_unread_count,
+    invalidate_unread_count,
 )
 from .context_processors import notifications
 
@@ -25,6 +28,9 @@ __all__ = [
     'notify_location_shared',
     'notify_item_shared',
     'notify_share_revoked',
+    'get_unread_count',
+    'increment_unread_count',
+    'invalidate_unread_count',
     # Context processors
     'notifications',
 ]
@@ -1,10 +1,9 @@
-from ..models import Notification
+from .services import get_unread_count
 
 
 def notifications(request):
     """Add unread notification count to template context"""
     if request.user.is_authenticated:
-        unread_count = Notification.objects.filter(user=request.user, read=False).count()
-        return {'unread_notification_count': unread_count}
+        return {'unread_notification_count': get_unread_count(request.user)}
     return {'unread_notification_count': 0}
 
@@ -1,12 +1,47 @@
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.utils.translation import gettext as _
 from ..models import Notification, LocationShare, ItemShare
+from ..utils import get_cache_key, get_cached_or_set, CACHE_TIMEOUT_LONG
 import json
 
 User = get_user_model()
 
 
+def get_unread_count_key(user_id):
+    """Cache key of a user's unread notification counter"""
+    return get_cache_key('notifications:unread', user_id)
+
+
+def get_unread_count(user):
+    """
+    Number of unread notifications of a user.
+    
+    Served from a cached counter that signals keep current; on a miss the
+    notifications are counted and the counter is stored for an hour.
+    """
+    return get_cached_or_set(
+        get_unread_count_key(user.id),
+        lambda: Notification.objects.filter(user=user, read=False).count(),
+        CACHE_TIMEOUT_LONG,
+    )
+
+
+def increment_unread_count(user_id):
+    """Add a new unread notification to the cached counter, if there is one"""
+    try:
+        cache.incr(get_unread_count_key(user_id))
+    except ValueError:
+        # No counter cached: it will be counted on the next read
+        pass
+
+
+def invalidate_unread_count(*user_ids):
+    """Drop cached unread counters after notifications were changed in bulk"""
+    cache.delete_many([get_unread_count_key(user_id) for user_id in user_ids])
+
+
 def create_notification(user, notification_type, message, related_object=None, metadata=None):
     """
     Create a notification for a user.
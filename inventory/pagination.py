@@ -0,0 +1,28 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ItemCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the item list.
+    
+    Pages are read with a range scan on the (created_at, id) index instead of
+    OFFSET, so every page costs the same regardless of its position.
+    
+    Unlike the page-number pagination of other lists, responses have no `count`
+    and `?page=` is ignored: clients follow the `next`/`previous` links.
+    """
+    ordering = ('-created_at', '-id')
+
+
+class ItemLogCursorPagination(CursorPagination):
+    """
+    Keyset pagination for an item's logs, newest first.
+    
+    Uses the (item, timestamp, id) index. New logs only ever appear before the
+    first page, so pages further down do not change once read.
+    """
+    ordering = ('-timestamp', '-id')
+    
+    def get_ordering(self, request, queryset, view):
+        """Always newest first: the view's ordering filter orders items, not their logs"""
+        return self.ordering
@@ -1,10 +1,48 @@
 from rest_framework import permissions
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from .models import Location, Item, LocationShare, ItemShare
+from .utils import get_cache_key, get_local_cached_or_set, CACHE_KEY_USER, CACHE_TIMEOUT_MEDIUM
+from .serializers import get_prefetched_shares, find_share_role
 
 User = get_user_model()
 
 
+# Share roles allowed to modify a shared object
+EDIT_ROLES = ('owner', 'editor')
+
+
+def get_share_role(obj, user, to_attr='user_shares'):
+    """
+    Role of the user's share on a Location or Item, or None.
+    
+    Read from shares prefetched into `to_attr` (or prefetch_related('shares')) when
+    present; otherwise looked up with one query whose result is kept on obj, so the
+    permission class and the can_* checks of the same request share it.
+    """
+    shares = get_prefetched_shares(obj, to_attr)
+    if shares is not None:
+        return find_share_role(shares, user)
+    roles = obj.__dict__.setdefault('_user_share_roles', {})
+    if user.id not in roles:
+        roles[user.id] = obj.shares.filter(user=user).values_list('role', flat=True).first()
+    return roles[user.id]
+
+
+def get_location_share_role(item, user):
+    """Role of the user's share on the item's location, or None"""
+    if item.location_id is None:
+        return None
+    return get_share_role(item.location, user, 'user_location_shares')
+
+
+def allows(role, method):
+    """Whether a share role permits a request method (any role can read)"""
+    if role is None:
+        return False
+    return method in permissions.SAFE_METHODS or role in EDIT_ROLES
+
+
 class IsOwnerOrShared(permissions.BasePermission):
     """
     Permission class that allows access if user is owner or has shared access.
@@ -15,50 +53,20 @@ class IsOwnerOrShared(permissions.BasePermission):
         if request.user.is_superuser:
             return True
         
-        # Check if user is owner
-        if hasattr(obj, 'owner') and obj.owner == request.user:
+        # Check if user is owner (compare ids: no query for the owner row)
+        owner_id = getattr(obj, 'owner_id', None)
+        if owner_id is not None and owner_id == request.user.id:
             return True
         
         # For Location: check shares
         if isinstance(obj, Location):
-            share = LocationShare.objects.filter(
-                location=obj,
-                user=request.user
-            ).first()
-            if share:
-                # Check role permissions
-                if request.method in permissions.SAFE_METHODS:
-                    return True  # Viewer can read
-                elif share.role in ['owner', 'editor']:
-                    return True  # Editor and owner can write
-            return False
+            return allows(get_share_role(obj, request.user), request.method)
         
         # For Item: check item shares and location shares
         if isinstance(obj, Item):
-            # Check direct item share
-            item_share = ItemShare.objects.filter(
-                item=obj,
-                user=request.user
-            ).first()
-            if item_share:
-                if request.method in permissions.SAFE_METHODS:
-                    return True
-                elif item_share.role in ['owner', 'editor']:
-                    return True
-            
-            # Check location share (if item has location)
-            if obj.location:
-                location_share = LocationShare.objects.filter(
-                    location=obj.location,
-                    user=request.user
-                ).first()
-                if location_share:
-                    if request.method in permissions.SAFE_METHODS:
-                        return True
-                    elif location_share.role in ['owner', 'editor']:
-                        return True
-            
-            return False
+            if allows(get_share_role(obj, request.user), request.method):
+                return True
+            return allows(get_location_share_role(obj, request.user), request.method)
         
         return False
 
@@ -69,9 +77,9 @@ def can_view_location(user, location):
         return False
     if user.is_superuser:
         return True
-    if location.owner == user:
+    if location.owner_id == user.id:
         return True
-    return LocationShare.objects.filter(location=location, user=user).exists()
+    return get_share_role(location, user) is not None
 
 
 def can_edit_location(user, location):
@@ -80,10 +88,9 @@ def can_edit_location(user, location):
         return False
     if user.is_superuser:
         return True
-    if location.owner == user:
+    if location.owner_id == user.id:
         return True
-    share = LocationShare.objects.filter(location=location, user=user).first()
-    return share and share.role in ['owner', 'editor']
+    return get_share_role(location, user) in EDIT_ROLES
 
 
 def can_view_item(user, item):
@@ -92,12 +99,12 @@ def can_view_item(user, item):
         return False
     if user.is_superuser:
         return True
-    if item.owner == user:
-        return True
-    if ItemShare.objects.filter(item=item, user=user).exists():
+    if item.owner_id == user.id:
         return True
-    if item.location and can_view_location(user, item.location):
+    if get_share_role(item, user) is not None:
         return True
+    if item.location_id is not None:
+        return item.location.owner_id == user.id or get_location_share_role(item, user) is not None
     return False
 
 
@@ -107,21 +114,44 @@ def can_edit_item(user, item):
         return False
     if user.is_superuser:
         return True
-    if item.owner == user:
+    if item.owner_id == user.id:
         return True
-    share = ItemShare.objects.filter(item=item, user=user).first()
-    if share and share.role in ['owner', 'editor']:
-        return True
-    if item.location and can_edit_location(user, item.location):
+    if get_share_role(item, user) in EDIT_ROLES:
         return True
+    if item.location_id is not None:
+        return item.location.owner_id == user.id or get_location_share_role(item, user) in EDIT_ROLES
     return False
 
 
 # Bulk permission functions for optimization
+def location_access_filter(user):
+    """
+    Q matching locations the user owns or has a share on.
+    
+    Shares are matched with a subquery, so the filtered queryset needs no join or DISTINCT.
+    """
+    return Q(owner=user) | Q(pk__in=LocationShare.objects.filter(user=user).values('location_id'))
+
+
+def item_access_filter(user):
+    """
+    Q matching items the user owns, has a share on, or that are in a location shared with them.
+    
+    Shares are matched with subqueries, so the filtered queryset needs no join or DISTINCT.
+    """
+    shared_location_ids = LocationShare.objects.filter(user=user).values('location_id')
+    return (
+        Q(owner=user)
+        | Q(pk__in=ItemShare.objects.filter(user=user).values('item_id'))
+        | Q(location_id__in=shared_location_ids)
+    )
+
+
 def get_accessible_location_ids(user):
     """
     Get all location IDs accessible to user (optimized bulk function).
     This function loads all shares in one query instead of checking each location separately.
+    The result is cached per user; signals clear it through invalidate_user_cache().
     
     Args:
         user: User object
@@ -132,22 +162,27 @@ def get_accessible_location_ids(user):
     if not user.is_authenticated:
         return set()
     if user.is_superuser:
-        from .models import Location
         return set(Location.objects.values_list('id', flat=True))
     
-    # Get all owned locations
-    owned_ids = set(Location.objects.filter(owner=user).values_list('id', flat=True))
-    
-    # Get all shared locations
-    shared_ids = set(LocationShare.objects.filter(user=user).values_list('location_id', flat=True))
+    def load_location_ids():
+        # Get all owned locations
+        owned_ids = set(Location.objects.filter(owner=user).values_list('id', flat=True))
+        
+        # Get all shared locations
+        shared_ids = set(LocationShare.objects.filter(user=user).values_list('location_id', flat=True))
+        
+        return owned_ids | shared_ids
     
-    return owned_ids | shared_ids
+    return get_local_cached_or_set(
+        get_cache_key(CACHE_KEY_USER, user, 'locations'), load_location_ids, CACHE_TIMEOUT_MEDIUM
+    )
 
 
 def get_accessible_item_ids(user):
     """
     Get all item IDs accessible to user (optimized bulk function).
     This function loads all shares in one query instead of checking each item separately.
+    The result is cached per user; signals clear it through invalidate_user_cache().
     
     Args:
         user: User object
@@ -158,22 +193,26 @@ def get_accessible_item_ids(user):
     if not user.is_authenticated:
         return set()
     if user.is_superuser:
-        from .models import Item
         return set(Item.objects.values_list('id', flat=True))
     
-    # Get all owned items
-    owned_ids = set(Item.objects.filter(owner=user).values_list('id', flat=True))
-    
-    # Get all directly shared items
-    shared_item_ids = set(ItemShare.objects.filter(user=user).values_list('item_id', flat=True))
+    def load_item_ids():
+        # Get all owned items
+        owned_ids = set(Item.objects.filter(owner=user).values_list('id', flat=True))
+        
+        # Get all directly shared items
+        shared_item_ids = set(ItemShare.objects.filter(user=user).values_list('item_id', flat=True))
+        
+        # Get items in shared locations
+        accessible_location_ids = get_accessible_location_ids(user)
+        shared_via_location_ids = set(
+            Item.objects.filter(location_id__in=accessible_location_ids).values_list('id', flat=True)
+        )
+        
+        return owned_ids | shared_item_ids | shared_via_location_ids
     
-    # Get items in shared locations
-    accessible_location_ids = get_accessible_location_ids(user)
-    shared_via_location_ids = set(
-        Item.objects.filter(location_id__in=accessible_location_ids).values_list('id', flat=True)
+    return get_local_cached_or_set(
+        get_cache_key(CACHE_KEY_USER, user, 'items'), load_item_ids, CACHE_TIMEOUT_MEDIUM
     )
-    
-    return owned_ids | shared_item_ids | shared_via_location_ids
 
 
 def filter_accessible_locations(queryset, user):
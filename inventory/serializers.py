@@ -5,6 +5,25 @@ from .models import Location, Item, ItemLog, Category, Tag, LocationShare, ItemS
 from .choices import ROOM_CHOICES
 
 
+def get_prefetched_shares(obj, to_attr):
+    """
+    Shares prefetched for obj, or None when they were not prefetched.
+    
+    Looks at Prefetch(..., to_attr=to_attr) first, then at a plain prefetch_related('shares').
+    """
+    if hasattr(obj, to_attr):
+        return getattr(obj, to_attr)
+    return getattr(obj, '_prefetched_objects_cache', {}).get('shares')
+
+
+def find_share_role(shares, user):
+    """Role of the user's share among shares, or None"""
+    for share in shares:
+        if share.user_id == user.id:
+            return share.role
+    return None
+
+
 class CategorySerializer(serializers.ModelSerializer):
     """Serializer for Category model"""
     items_count = serializers.IntegerField(read_only=True)
@@ -70,23 +89,15 @@ class LocationSerializer(serializers.ModelSerializer):
         if obj.owner == request.user:
             return 'owner'
         
-        # Use prefetched shares if available (from ViewSet queryset)
-        # Check if user_shares attribute exists (from Prefetch with to_attr)
-        if hasattr(obj, 'user_shares'):
-            # Use prefetched shares from Prefetch with to_attr
-            for share in obj.user_shares:
-                if share.user_id == request.user.id:
-                    return share.role
-        # Check if shares are in _prefetched_objects_cache (standard prefetch)
-        elif hasattr(obj, '_prefetched_objects_cache') and 'shares' in obj._prefetched_objects_cache:
-            prefetched_shares = obj._prefetched_objects_cache['shares']
-            for share in prefetched_shares:
-                if share.user_id == request.user.id:
-                    return share.role
-        # Fallback: check if user_shares dict is in context (from ViewSet)
-        user_shares = self.context.get('user_location_shares', {})
-        if obj.id in user_shares:
-            return user_shares[obj.id]
+        # Prefetched shares (from ViewSet queryset) already cover this user
+        shares = get_prefetched_shares(obj, 'user_shares')
+        if shares is not None:
+            return find_share_role(shares, request.user)
+        
+        # Fallback: user_shares dict in context (from ViewSet) holds all of the user's shares
+        user_shares = self.context.get('user_location_shares')
+        if user_shares is not None:
+            return user_shares.get(obj.id)
         
         # Last resort: single query (should be rare if ViewSet is optimized)
         share = LocationShare.objects.filter(location=obj, user=request.user).first()
@@ -161,55 +172,40 @@ class ItemSerializer(serializers.ModelSerializer):
         if obj.owner == request.user:
             return 'owner'
         
-        # Use prefetched shares if available (from ViewSet queryset)
-        # Check if user_shares attribute exists (from Prefetch with to_attr)
-        if hasattr(obj, 'user_shares'):
-            # Use prefetched item shares from Prefetch with to_attr
-            for share in obj.user_shares:
-                if share.user_id == request.user.id:
-                    return share.role
-        # Check standard prefetch cache
-        elif hasattr(obj, '_prefetched_objects_cache') and 'shares' in obj._prefetched_objects_cache:
-            prefetched_shares = obj._prefetched_objects_cache['shares']
-            for share in prefetched_shares:
-                if share.user_id == request.user.id:
-                    return share.role
-        
-        # Check context for cached shares (from ViewSet)
-        user_item_shares = self.context.get('user_item_shares', {})
-        if obj.id in user_item_shares:
-            return user_item_shares[obj.id]
+        # Direct item share: prefetched shares or the context dict are complete for this user
+        item_shares_known = True
+        shares = get_prefetched_shares(obj, 'user_shares')
+        if shares is not None:
+            role = find_share_role(shares, request.user)
+        elif 'user_item_shares' in self.context:
+            role = self.context['user_item_shares'].get(obj.id)
+        else:
+            role = None
+            item_shares_known = False
+        if role:
+            return role
         
         # Check location share if item has location
         if obj.location:
-            # Use prefetched location shares if available (from Prefetch with to_attr)
-            if hasattr(obj.location, 'user_location_shares'):
-                for share in obj.location.user_location_shares:
-                    if share.user_id == request.user.id:
-                        return share.role
-            # Check standard prefetch cache
-            elif hasattr(obj.location, '_prefetched_objects_cache') and 'shares' in obj.location._prefetched_objects_cache:
-                prefetched_location_shares = obj.location._prefetched_objects_cache['shares']
-                for share in prefetched_location_shares:
-                    if share.user_id == request.user.id:
-                        return share.role
-            
-            # Check context for cached location shares
-            user_location_shares = self.context.get('user_location_shares', {})
-            if obj.location.id in user_location_shares:
-                return user_location_shares[obj.location.id]
-            
-            # Last resort: single query (should be rare if ViewSet is optimized)
-            location_share = LocationShare.objects.filter(
-                location=obj.location, user=request.user
-            ).first()
-            if location_share:
-                return location_share.role
+            location_shares = get_prefetched_shares(obj.location, 'user_location_shares')
+            if location_shares is not None:
+                role = find_share_role(location_shares, request.user)
+            elif 'user_location_shares' in self.context:
+                role = self.context['user_location_shares'].get(obj.location_id)
+            else:
+                # Last resort: single query (should be rare if ViewSet is optimized)
+                location_share = LocationShare.objects.filter(
+                    location=obj.location, user=request.user
+                ).first()
+                role = location_share.role if location_share else None
+            if role:
+                return role
         
         # Last resort: check item share directly
-        share = ItemShare.objects.filter(item=obj, user=request.user).first()
-        if share:
-            return share.role
+        if not item_shares_known:
+            share = ItemShare.objects.filter(item=obj, user=request.user).first()
+            if share:
+                return share.role
         
         return None
     
@@ -266,8 +262,189 @@ class NotificationSerializer(serializers.ModelSerializer):
         model = Notification
         fields = [
             'id', 'user', 'notification_type', 'notification_type_display',
-            'message', 'read', 'created_at', 'content_type', 'object_id',
+            'message', 'read', 'read_at', 'created_at', 'content_type', 'object_id',
             'related_object_type', 'metadata'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'read_at', 'created_at']
+
+
+
+# Read-only list rows.
+# The functions below build the same payloads as LocationSerializer, ItemSerializer and
+# ItemLogSerializer from .values() dicts, skipping model instances and per-field DRF
+# machinery on large lists. Keep them in sync with the serializers' fields.
+
+LOCATION_ROW_FIELDS = (
+    'id', 'name', 'room_type', 'parent_id', 'parent__name', 'is_box', 'qr_code',
+    'items_count', 'children_count', 'owner_id', 'owner__username', 'created_at',
+)
+ITEM_ROW_FIELDS = (
+    'id', 'name', 'description', 'quantity', 'condition', 'location_id', 'location__name',
+    'category_id', 'category__name', 'category__color', 'image',
+    'owner_id', 'owner__username', 'created_at', 'updated_at',
+)
+ITEMLOG_ROW_FIELDS = (
+    'id', 'item_id', 'item__name', 'action', 'details', 'timestamp', 'user_id', 'user__username',
+)
+
+# Fields read through a nullable foreign key; DRF leaves them out when it is empty
+LOCATION_ROW_RELATED = (('parent_id', ('parent_name',)), ('owner_id', ('owner_username',)))
+ITEM_ROW_RELATED = (
+    ('location_id', ('location_name',)),
+    ('category_id', ('category_name', 'category_color')),
+    ('owner_id', ('owner_username',)),
+)
+ITEMLOG_ROW_RELATED = (('user_id', ('user_username',)),)
+
+ROOM_LABELS = dict(ROOM_CHOICES)
+datetime_field = serializers.DateTimeField()
+
+
+def format_datetime(value):
+    """Datetime as rendered by serializers.DateTimeField"""
+    return datetime_field.to_representation(value)
+
+
+def format_file_url(model, field_name, name, request):
+    """File URL as rendered by serializers.FileField/ImageField"""
+    if not name:
+        return None
+    url = model._meta.get_field(field_name).storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def drop_empty_related(data, row, related):
+    """Remove fields sourced through an empty foreign key from a row payload"""
+    for fk_field, keys in related:
+        if row[fk_field] is None:
+            for key in keys:
+                del data[key]
+    return data
+
+
+def get_request_user(context):
+    """Authenticated user from serializer context, or None"""
+    request = context.get('request')
+    if request and request.user.is_authenticated:
+        return request.user
+    return None
+
+
+def serialize_location_rows(rows, context):
+    """
+    LocationSerializer payloads for rows of LOCATION_ROW_FIELDS.
+    
+    Roles come from context['user_location_shares'] (location_id -> role).
+    """
+    request = context.get('request')
+    user = get_request_user(context)
+    location_shares = context.get('user_location_shares', {})
+    data = []
+    for row in rows:
+        is_owner = user is not None and row['owner_id'] == user.id
+        if user is None:
+            user_role = None
+        elif is_owner:
+            user_role = 'owner'
+        else:
+            user_role = location_shares.get(row['id'])
+        room_type_display = ROOM_LABELS.get(row['room_type'], row['room_type'])
+        data.append(drop_empty_related({
+            'id': str(row['id']),
+            'name': row['name'],
+            'room_type': row['room_type'],
+            'room_type_display': str(room_type_display) if room_type_display is not None else None,
+            'parent': row['parent_id'],
+            'parent_name': row['parent__name'],
+            'is_box': row['is_box'],
+            'qr_code': format_file_url(Location, 'qr_code', row['qr_code'], request),
+            'items_count': row['items_count'],
+            'children_count': row['children_count'],
+            'owner': row['owner_id'],
+            'owner_username': row['owner__username'],
+            'is_owner': is_owner,
+            'user_role': user_role,
+            'created_at': format_datetime(row['created_at']),
+        }, row, LOCATION_ROW_RELATED))
+    return data
+
+
+def get_item_tags(item_ids):
+    """TagSerializer payloads of the given items in one query: item_id -> list"""
+    tags = {item_id: [] for item_id in item_ids}
+    tag_rows = Item.tags.through.objects.filter(item_id__in=item_ids).order_by('tag__name').values(
+        'item_id', 'tag_id', 'tag__name', 'tag__color', 'tag__created_at'
+    )
+    for row in tag_rows:
+        tags[row['item_id']].append({
+            'id': str(row['tag_id']),
+            'name': row['tag__name'],
+            'color': row['tag__color'],
+            'created_at': format_datetime(row['tag__created_at']),
+        })
+    return tags
+
+
+def serialize_item_rows(rows, context):
+    """
+    ItemSerializer payloads for rows of ITEM_ROW_FIELDS.
+    
+    Roles come from context['user_item_shares'] and context['user_location_shares'].
+    """
+    request = context.get('request')
+    user = get_request_user(context)
+    item_shares = context.get('user_item_shares', {})
+    location_shares = context.get('user_location_shares', {})
+    tags = get_item_tags([row['id'] for row in rows])
+    data = []
+    for row in rows:
+        is_owner = user is not None and row['owner_id'] == user.id
+        if user is None:
+            user_role = None
+        elif is_owner:
+            user_role = 'owner'
+        else:
+            user_role = item_shares.get(row['id'])
+            if not user_role and row['location_id']:
+                user_role = location_shares.get(row['location_id'])
+        data.append(drop_empty_related({
+            'id': str(row['id']),
+            'name': row['name'],
+            'description': row['description'],
+            'quantity': row['quantity'],
+            'condition': row['condition'],
+            'condition_display': row['condition'].title() if row['condition'] else '',
+            'location': row['location_id'],
+            'location_name': row['location__name'],
+            'category': row['category_id'],
+            'category_name': row['category__name'],
+            'category_color': row['category__color'],
+            'tags': tags[row['id']],
+            'image': format_file_url(Item, 'image', row['image'], request),
+            'owner': row['owner_id'],
+            'owner_username': row['owner__username'],
+            'is_owner': is_owner,
+            'user_role': user_role,
+            'created_at': format_datetime(row['created_at']),
+            'updated_at': format_datetime(row['updated_at']),
+        }, row, ITEM_ROW_RELATED))
+    return data
+
 
+def serialize_itemlog_rows(rows, context):
+    """ItemLogSerializer payloads for rows of ITEMLOG_ROW_FIELDS"""
+    return [
+        drop_empty_related({
+            'id': str(row['id']),
+            'item': row['item_id'],
+            'item_name': row['item__name'],
+            'action': row['action'],
+            'details': row['details'],
+            'timestamp': format_datetime(row['timestamp']),
+            'user': row['user_id'],
+            'user_username': row['user__username'],
+        }, row, ITEMLOG_ROW_RELATED)
+        for row in rows
+    ]
@@ -1,16 +1,74 @@
+from django.core.signals import request_started, request_finished
 from django.db.models.signals import post_save, post_delete, pre_save
+from django.db import connections
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Item, ItemLog, Location, LocationShare, ItemShare
-from .utils import invalidate_location_cache, invalidate_item_cache, invalidate_user_cache
+from .models import Item, ItemLog, Location, LocationShare, ItemShare, Notification
+from .utils import invalidate_location_cache, invalidate_item_cache, invalidate_user_cache, get_location_path
 from .notifications import (
     notify_item_created, notify_item_updated, notify_item_moved,
-    notify_location_shared, notify_item_shared, notify_share_revoked
+    notify_location_shared, notify_item_shared, notify_share_revoked,
+    increment_unread_count, invalidate_unread_count,
 )
-from .analytics.services import track_event
+from .analytics.services import track_event, start_event_buffer, flush_event_buffer
+from .authentication import update_user_token, delete_user_token
+from .images import start_image_queue, flush_image_queue
 
 User = get_user_model()
 
+def close_request_connections():
+    """
+    Close database connections used after Django's own request_finished cleanup.
+    
+    django.db connects close_old_connections() to request_finished before these
+    receivers, so a connection opened by a flush would outlive CONN_MAX_AGE.
+    Connections inside an atomic block (e.g. in TestCase) are left alone.
+    """
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close_if_unusable_or_obsolete()
+
+
+@receiver(request_started)
+def start_analytics_buffer(sender, **kwargs):
+    """Collect analytics events tracked during the request"""
+    start_event_buffer()
+
+
+@receiver(request_finished)
+def flush_analytics_buffer(sender, **kwargs):
+    """Write collected analytics events once the response has been sent"""
+    flush_event_buffer()
+    close_request_connections()
+
+
+@receiver(request_started)
+def start_image_resize_queue(sender, **kwargs):
+    """Collect image resizes scheduled during the request"""
+    start_image_queue()
+
+
+@receiver(request_finished)
+def flush_image_resize_queue(sender, **kwargs):
+    """Resize uploaded images once the response has been sent"""
+    flush_image_queue()
+    close_request_connections()
+
+
+def invalidate_location_sharers_cache(*locations):
+    """Invalidate cached access of the owners of the given locations and the users they are shared with"""
+    locations = [location for location in locations if location]
+    if not locations:
+        return
+    user_ids = set(
+        LocationShare.objects.filter(location__in=locations).values_list('user_id', flat=True)
+    )
+    # Items in a location are accessible to its owner, who may not own the items
+    user_ids.update(location.owner_id for location in locations if location.owner_id)
+    for user_id in user_ids:
+        invalidate_user_cache(user_id)
+
+
 # Store old location before save for move notifications
 _item_old_locations = {}
 
@@ -49,11 +107,15 @@ def create_item_log(sender, instance, created, **kwargs):
         invalidate_item_cache()
         if instance.location:
             invalidate_location_cache(instance.location.id)
+            invalidate_location_sharers_cache(instance.location)
         if instance.owner:
             invalidate_user_cache(instance.owner.id)
     else:
         # Item was updated - check what changed
         old_location = _item_old_locations.pop(instance.pk, None) if instance.pk else None
+        if old_location != instance.location:
+            # Users sharing either location gain or lose access to the item
+            invalidate_location_sharers_cache(old_location, instance.location)
         
         if 'update_fields' in kwargs and kwargs['update_fields']:
             # Only log if significant fields changed
@@ -98,6 +160,7 @@ def log_item_deletion(sender, instance, **kwargs):
     invalidate_item_cache()
     if instance.location:
         invalidate_location_cache(instance.location.id)
+        invalidate_location_sharers_cache(instance.location)
     if instance.owner:
         invalidate_user_cache(instance.owner.id)
 
@@ -105,17 +168,11 @@ def log_item_deletion(sender, instance, **kwargs):
 @receiver(pre_save, sender=Location)
 def validate_location_hierarchy(sender, instance, **kwargs):
     """Validate that location doesn't create circular references"""
-    if instance.parent:
-        # Check for circular reference
-        current = instance.parent
-        depth = 0
-        max_depth = 10  # Prevent infinite loops
-        
-        while current and depth < max_depth:
-            if current.id == instance.id:
-                raise ValueError("Circular reference detected: location cannot be its own parent")
-            current = current.parent
-            depth += 1
+    if instance.parent_id:
+        # Check for circular reference: the new parent's ancestors are loaded in one query
+        ancestor_ids = {ancestor.id for ancestor in get_location_path(instance.parent_id)}
+        if instance.id in ancestor_ids:
+            raise ValueError("Circular reference detected: location cannot be its own parent")
 
 
 @receiver(post_save, sender=Location)
@@ -145,6 +202,13 @@ def invalidate_location_cache_on_delete(sender, instance, **kwargs):
         invalidate_user_cache(instance.owner.id)
 
 
+@receiver([post_save, post_delete], sender=LocationShare)
+@receiver([post_save, post_delete], sender=ItemShare)
+def invalidate_shared_user_cache(sender, instance, **kwargs):
+    """Invalidate cached access of the user a share is granted to or revoked from"""
+    invalidate_user_cache(instance.user_id)
+
+
 @receiver(post_save, sender=LocationShare)
 def notify_location_share_created(sender, instance, created, **kwargs):
     """Create notification when location is shared"""
@@ -182,3 +246,31 @@ def notify_item_share_revoked(sender, instance, **kwargs):
         revoked_by=instance.item.owner
     )
 
+
+@receiver(post_save, sender=Notification)
+def update_unread_count_on_save(sender, instance, created, **kwargs):
+    """Keep the cached unread counter current"""
+    if created:
+        if not instance.read:
+            increment_unread_count(instance.user_id)
+    else:
+        # Read state may have changed either way: recount on next read
+        invalidate_unread_count(instance.user_id)
+
+
+@receiver(post_delete, sender=Notification)
+def update_unread_count_on_delete(sender, instance, **kwargs):
+    """Drop the cached unread counter when a notification is deleted"""
+    invalidate_unread_count(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def update_token_user_on_save(sender, instance, **kwargs):
+    """Keep the user cached with the API token current"""
+    update_user_token(instance)
+
+
+@receiver(post_delete, sender=User)
+def delete_token_on_user_delete(sender, instance, **kwargs):
+    """Revoke the API token of a deleted user"""
+    delete_user_token(instance)
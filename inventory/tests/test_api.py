@@ -0,0 +1,496 @@
+import json
+import shutil
+import tempfile
+import uuid
+from io import BytesIO
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from inventory.models import Location, Item, ItemLog, Tag, Category, LocationShare, ItemShare, Notification
+from inventory.analytics.services import track_event
+from inventory.serializers import (
+    LocationSerializer, ItemSerializer, ItemLogSerializer,
+    LOCATION_ROW_FIELDS, ITEM_ROW_FIELDS, ITEMLOG_ROW_FIELDS,
+    serialize_location_rows, serialize_item_rows, serialize_itemlog_rows,
+)
+from inventory.utils import count_subquery
+from inventory.renderers import ORJSONRenderer
+from inventory.authentication import (
+    CacheTokenAuthentication, get_token_cache_key, get_legacy_token_cache_key, AUTH_USER_FIELDS,
+)
+
+User = get_user_model()
+
+
+class ActionQueryCountTest(TestCase):
+    """Tests that location/item detail actions do not run queries per row"""
+    
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        self.viewer = User.objects.create_user('viewer')
+        self.location = Location.objects.create(name='Root', owner=self.owner)
+        LocationShare.objects.create(location=self.location, user=self.viewer, role='viewer')
+        self.tags = [Tag.objects.create(name=f'Tag {i}') for i in range(3)]
+        self.item = None
+    
+    def add_rows(self, count):
+        """Add child locations, items and logs under the root location"""
+        for i in range(count):
+            Location.objects.create(name=f'Child {i}', parent=self.location, owner=self.owner)
+            self.item = Item.objects.create(name=f'Item {i}', location=self.location, owner=self.owner)
+            self.item.tags.set(self.tags)
+            ItemLog.objects.create(item=self.item, action='updated', user=self.owner)
+    
+    def count_queries(self, user, url):
+        """Number of queries for an uncached GET request"""
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+    
+    def action_query_counts(self):
+        urls = [
+            f'/v1/api/locations/{self.location.pk}/items/',
+            f'/v1/api/locations/{self.location.pk}/children/',
+            f'/v1/api/items/{self.item.pk}/logs/',
+        ]
+        return [self.count_queries(user, url) for user in (self.owner, self.viewer) for url in urls]
+    
+    def test_action_queries_do_not_grow_with_rows(self):
+        """Test items/children/logs actions run the same number of queries for 2 and 5 rows"""
+        self.add_rows(2)
+        small = self.action_query_counts()
+        self.add_rows(3)
+        self.assertEqual(self.action_query_counts(), small)
+
+
+class ActionPaginationTest(TestCase):
+    """Tests that location/item detail actions return paginated responses"""
+    
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        self.location = Location.objects.create(name='Root', owner=self.owner)
+        for i in range(25):
+            Item.objects.create(name=f'Item {i}', location=self.location, owner=self.owner)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+    
+    def test_items_are_paginated(self):
+        """Test items action returns one page and honours the page parameter"""
+        url = f'/v1/api/locations/{self.location.pk}/items/'
+        first = self.client.get(url).json()
+        second = self.client.get(url, {'page': 2}).json()
+        self.assertEqual(first['count'], 25)
+        self.assertEqual(len(first['results']), 20)
+        self.assertEqual(len(second['results']), 5)
+    
+    def test_logs_use_cursor_pagination(self):
+        """Test item logs are paged newest first by cursor and every log is returned once"""
+        item = Item.objects.create(name='Logged', location=self.location, owner=self.owner)
+        for i in range(24):
+            ItemLog.objects.create(item=item, action='updated', details=f'Update {i}')
+        first = self.client.get(f'/v1/api/items/{item.pk}/logs/').json()
+        self.assertNotIn('count', first)
+        second = self.client.get(first['next']).json()
+        self.assertIsNone(second['next'])
+        logs = first['results'] + second['results']
+        self.assertEqual(len({log['id'] for log in logs}), item.logs.count())
+        timestamps = [log['timestamp'] for log in logs]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+    
+    def test_new_log_shown_on_cached_head_page(self):
+        """Test that a log written by an item update is not hidden by the cached first page"""
+        item = Item.objects.create(name='Logged', location=self.location, owner=self.owner)
+        url = f'/v1/api/items/{item.pk}/logs/'
+        self.assertEqual(len(self.client.get(url).json()['results']), 1)
+        
+        item.name = 'Renamed'
+        item.save(update_fields=['name'])
+        results = self.client.get(url).json()['results']
+        self.assertEqual([log['action'] for log in results], ['updated', 'created'])
+    
+    def test_items_cached_as_json(self):
+        """Test a cached page is served from rendered bytes without loading the items again"""
+        url = f'/v1/api/locations/{self.location.pk}/items/'
+        first = self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            second = self.client.get(url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Type'], 'application/json')
+        self.assertFalse(any('inventory_item' in query['sql'] for query in context.captured_queries))
+        # The browsable API renders the decoded payload
+        self.assertContains(self.client.get(url, HTTP_ACCEPT='text/html'), 'Item 24')
+
+
+class RowSerializationTest(TestCase):
+    """Tests that .values() row payloads match the model serializers"""
+    
+    def setUp(self):
+        self.owner = User.objects.create_user('owner')
+        self.viewer = User.objects.create_user('viewer')
+        root = Location.objects.create(name='Root', owner=self.owner, room_type='kitchen')
+        Location.objects.create(name='Box', parent=root, is_box=False)
+        category = Category.objects.create(name='Tools')
+        tag = Tag.objects.create(name='Red')
+        item = Item.objects.create(name='Hammer', location=root, owner=self.owner, category=category)
+        item.tags.add(tag)
+        Item.objects.create(name='Loose', owner=self.viewer)
+        ItemLog.objects.create(item=item, action='updated', user=self.owner)
+        ItemLog.objects.create(item=item, action='moved')
+        LocationShare.objects.create(location=root, user=self.viewer, role='editor')
+        ItemShare.objects.create(item=item, user=self.viewer, role='viewer')
+        request = APIRequestFactory().get('/')
+        request.user = self.viewer
+        self.context = {
+            'request': request,
+            'user_location_shares': {root.id: 'editor'},
+            'user_item_shares': {item.id: 'viewer'},
+        }
+    
+    def assertRowsMatch(self, queryset, fields, serialize_rows, serializer_class):
+        rows = serialize_rows(list(queryset.values(*fields)), self.context)
+        expected = serializer_class(queryset, many=True, context=self.context).data
+        self.assertEqual([dict(data) for data in expected], rows)
+    
+    def test_location_rows(self):
+        """Test location rows match LocationSerializer"""
+        locations = Location.objects.annotate(
+            items_count=count_subquery(Item, 'location'),
+            children_count=count_subquery(Location, 'parent'),
+        )
+        self.assertRowsMatch(locations, LOCATION_ROW_FIELDS, serialize_location_rows, LocationSerializer)
+    
+    def test_item_rows(self):
+        """Test item rows match ItemSerializer"""
+        self.assertRowsMatch(Item.objects.all(), ITEM_ROW_FIELDS, serialize_item_rows, ItemSerializer)
+    
+    def test_itemlog_rows(self):
+        """Test item log rows match ItemLogSerializer"""
+        self.assertRowsMatch(ItemLog.objects.all(), ITEMLOG_ROW_FIELDS, serialize_itemlog_rows, ItemLogSerializer)
+
+
+class ItemsCountTest(TestCase):
+    """Tests items_count on category and tag lists"""
+    
+    def setUp(self):
+        self.owner = User.objects.create_user('owner')
+        self.category = Category.objects.create(name='Tools')
+        Category.objects.create(name='Empty')
+        self.tags = [Tag.objects.create(name='Red'), Tag.objects.create(name='Blue')]
+        for i in range(3):
+            item = Item.objects.create(name=f'Item {i}', owner=self.owner, category=self.category)
+            item.tags.set(self.tags[:i])
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+    
+    def get_counts(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {row['name']: row['items_count'] for row in response.json()['results']}
+    
+    def test_category_counts(self):
+        """Test category list counts items once per category"""
+        self.assertEqual(self.get_counts('/v1/api/categories/'), {'Empty': 0, 'Tools': 3})
+    
+    def test_tag_counts(self):
+        """Test tag list counts items once per tag"""
+        self.assertEqual(self.get_counts('/v1/api/tags/'), {'Blue': 1, 'Red': 2})
+    
+    def test_items_action(self):
+        """Test category/tag items actions return the related items"""
+        response = self.client.get(f'/v1/api/tags/{self.tags[0].pk}/items/')
+        self.assertEqual(sorted(item['name'] for item in response.json()), ['Item 1', 'Item 2'])
+        response = self.client.get(f'/v1/api/categories/{self.category.pk}/items/')
+        self.assertEqual(len(response.json()), 3)
+
+
+class ItemDetailLogsTest(TestCase):
+    """Tests the logs nested in the item detail response"""
+    
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        self.item = Item.objects.create(name='Hammer', owner=self.owner)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+    
+    def get_detail(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/v1/api/items/{self.item.pk}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(context)
+    
+    def test_logs_do_not_query_per_user(self):
+        """Test log users are loaded with the logs prefetch, not one query per log"""
+        ItemLog.objects.create(item=self.item, action='updated', user=self.owner)
+        _, small = self.get_detail()
+        for i in range(3):
+            user = User.objects.create_user(f'user{i}')
+            ItemLog.objects.create(item=self.item, action='moved', user=user)
+        data, large = self.get_detail()
+        self.assertEqual(large, small)
+        usernames = {log.get('user_username') for log in data['logs']}
+        self.assertTrue({'owner', 'user0', 'user1', 'user2'} <= usernames)
+        self.assertEqual({log['item_name'] for log in data['logs']}, {'Hammer'})
+
+
+class MarkAllReadTest(TestCase):
+    """Tests marking all notifications as read through the API"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user')
+        for i in range(3):
+            Notification.objects.create(user=self.user, notification_type='item_created', message=f'Message {i}')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_mark_all_read(self):
+        """Test notifications get read_at and the cached unread counter is reset after commit"""
+        url = '/v1/api/notifications/unread_count/'
+        self.assertEqual(self.client.get(url).json()['unread_count'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/v1/api/notifications/mark_all_read/')
+        self.assertEqual(response.json()['message'], '3 notifications marked as read')
+        self.assertFalse(Notification.objects.filter(read_at__isnull=True).exists())
+        self.assertEqual(self.client.get(url).json()['unread_count'], 0)
+
+
+class PopularAnalyticsTest(TestCase):
+    """Tests popular items/locations analytics payloads"""
+    
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        self.location = Location.objects.create(name='Kitchen', owner=self.owner)
+        self.items = [
+            Item.objects.create(name=f'Item {i}', location=self.location, owner=self.owner) for i in range(3)
+        ]
+        for i, item in enumerate(self.items):
+            for _ in range(i + 1):
+                track_event(self.owner, 'item_view', content_object=item)
+        track_event(self.owner, 'location_view', content_object=self.location)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+    
+    def test_popular_items(self):
+        """Test items are ranked by views and serialized like ItemSerializer plus view_count"""
+        data = self.client.get('/v1/api/analytics/popular_items/').json()
+        self.assertEqual([row['view_count'] for row in data], [3, 2, 1])
+        request = APIRequestFactory().get('/')
+        request.user = self.owner
+        expected = ItemSerializer(self.items[2], context={'request': request}).data
+        self.assertEqual(data[0], dict(json.loads(JSONRenderer().render(expected)), view_count=3))
+    
+    def test_popular_locations(self):
+        """Test locations include counts and view_count"""
+        data = self.client.get('/v1/api/analytics/popular_locations/').json()
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]['items_count'], 3)
+        self.assertEqual(data[0]['view_count'], 1)
+        self.assertEqual(data[0]['user_role'], 'owner')
+    
+    def test_item_analytics_scoped_to_accessible_items(self):
+        """Test item/location analytics are found for the owner and hidden from other users"""
+        url = f'/v1/api/analytics/item/{self.items[1].pk}/'
+        data = self.client.get(url).json()
+        self.assertEqual((data['item_name'], data['total_views']), ('Item 1', 2))
+        location_url = f'/v1/api/analytics/location/{self.location.pk}/'
+        self.assertEqual(self.client.get(location_url).json()['total_views'], 1)
+        self.client.force_authenticate(User.objects.create_user('other'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(location_url).status_code, 404)
+
+
+class ORJSONRendererTest(TestCase):
+    """Tests that ORJSONRenderer output matches JSONRenderer"""
+    
+    def test_matches_json_renderer(self):
+        """Test datetimes, UUIDs, lazy strings, Decimals and U+2028 render like JSONRenderer"""
+        data = {
+            'id': uuid.uuid4(),
+            'created_at': timezone.now(),
+            'label': gettext_lazy('Kitchen'),
+            'price': Decimal('1.50'),
+            'text': 'line\u2028break \u00e9',
+            'rows': [{'count': 1, 'empty': None}],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+    
+    def test_indent_falls_back_to_json_renderer(self):
+        """Test indented output is rendered by JSONRenderer"""
+        data = {'name': 'Box'}
+        media_type = 'application/json; indent=2'
+        self.assertEqual(ORJSONRenderer().render(data, media_type), JSONRenderer().render(data, media_type))
+
+
+class ShareActionTest(TestCase):
+    """Tests the location/item share actions"""
+    
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        self.viewer = User.objects.create_user('viewer')
+        self.location = Location.objects.create(name='Root', owner=self.owner)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+    
+    def test_share_creates_then_updates_role(self):
+        """Test sharing again updates the role of the existing share"""
+        url = f'/v1/api/locations/{self.location.pk}/share/'
+        response = self.client.post(url, {'user': self.viewer.id, 'role': 'viewer'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created_by_username'], 'owner')
+        response = self.client.post(url, {'user': self.viewer.id, 'role': 'editor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['role'], response.json()['user_username']), ('editor', 'viewer'))
+        self.assertEqual(LocationShare.objects.get().role, 'editor')
+        # Only the new share notifies the user
+        self.assertEqual(Notification.objects.filter(user=self.viewer).count(), 1)
+    
+    def test_item_reshare_locks_share_row_only(self):
+        """Test re-sharing an item updates the role without locking an outer join (PostgreSQL)"""
+        item = Item.objects.create(name='Item', owner=self.owner)
+        url = f'/v1/api/items/{item.pk}/share/'
+        self.assertEqual(self.client.post(url, {'user': self.viewer.id, 'role': 'viewer'}).status_code, 201)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'user': self.viewer.id, 'role': 'editor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.json()['role'], response.json()['user_username'], response.json()['created_by_username']),
+            ('editor', 'viewer', 'owner'),
+        )
+        self.assertEqual(ItemShare.objects.get().role, 'editor')
+        share_lookups = [q['sql'] for q in queries if q['sql'].startswith('SELECT "inventory_itemshare"."id"')]
+        self.assertTrue(share_lookups)
+        self.assertFalse([sql for sql in share_lookups if 'OUTER JOIN' in sql])
+
+
+class TokenAuthenticationTest(TestCase):
+    """Tests for the cache token authentication"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', password='secret', email='user@example.com')
+        self.client = APIClient()
+        response = self.client.post(
+            '/v1/api/auth/token/', {'username': 'user', 'password': 'secret'}, format='json'
+        )
+        self.token = response.json()['token']
+    
+    def test_cache_holds_identity_only(self):
+        """Test that the token entry holds no password hash and requests do not load the user"""
+        identity = cache.get(get_token_cache_key(self.token))
+        self.assertEqual(set(identity), set(AUTH_USER_FIELDS))
+        self.assertNotIn(self.user.password, repr(identity))
+        
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        with self.assertNumQueries(0):
+            user, _ = CacheTokenAuthentication().authenticate(request)
+        self.assertEqual((user.pk, user.username, user.is_active), (self.user.pk, 'user', True))
+        
+        # Fields outside the identity are loaded on access
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(self.client.get('/v1/api/auth/info/').json()['email'], 'user@example.com')
+        
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/v1/api/auth/info/').status_code, 401)
+    
+    def test_legacy_token_is_migrated(self):
+        """Test that a token stored under its raw key still works and is moved to the hashed key"""
+        cache.delete(get_token_cache_key(self.token))
+        cache.set(get_legacy_token_cache_key(self.token), self.user.pk)
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(self.client.get('/v1/api/auth/info/').status_code, 200)
+        self.assertIsNone(cache.get(get_legacy_token_cache_key(self.token)))
+        self.assertEqual(cache.get(get_token_cache_key(self.token))['id'], self.user.pk)
+    
+    def test_malformed_token_is_rejected(self):
+        """Test that a malformed token gets 401 even on endpoints open to anonymous users"""
+        for header in ('Token short', 'Bearer not/a+token!!', 'x' * 200):
+            self.client.credentials(HTTP_AUTHORIZATION=header)
+            response = self.client.post(
+                '/v1/api/auth/token/', {'username': 'user', 'password': 'secret'}, format='json'
+            )
+            self.assertEqual(response.status_code, 401, header)
+        
+        # An empty token is treated as no credentials
+        self.client.credentials(HTTP_AUTHORIZATION='Token ')
+        response = self.client.post(
+            '/v1/api/auth/token/', {'username': 'user', 'password': 'secret'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(IMAGE_MAX_WIDTH=100, IMAGE_MAX_HEIGHT=100)
+class ImageResizeTest(TestCase):
+    """Tests that uploaded images are resized after the response"""
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('owner'))
+    
+    def test_upload_is_resized_after_response(self):
+        """Test that an image uploaded through the API is replaced by a resized copy"""
+        buffer = BytesIO()
+        Image.new('RGB', (400, 200)).save(buffer, format='PNG')
+        image = SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png')
+        
+        response = self.client.post(
+            '/v1/api/items/', {'name': 'Photo', 'quantity': 1, 'image': image}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        
+        item = Item.objects.get(name='Photo')
+        self.assertTrue(item.image.name.endswith('.jpg'), item.image.name)
+        with Image.open(item.image.path) as resized:
+            self.assertEqual(resized.size, (100, 50))
+
+
+class ItemListCursorTest(TestCase):
+    """Tests for the keyset-paginated item list"""
+    
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        for i in range(25):
+            Item.objects.create(name=f'Item {i:02}', owner=self.owner)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+    
+    def test_next_cursor_survives_insert(self):
+        """Test that the next cursor continues where the page ended after a new item is added"""
+        first = self.client.get('/v1/api/items/').json()
+        self.assertNotIn('count', first)
+        self.assertEqual(len(first['results']), 20)
+        
+        Item.objects.create(name='New Item', owner=self.owner)
+        second = self.client.get(first['next']).json()
+        
+        names = [row['name'] for row in first['results'] + second['results']]
+        self.assertEqual(len(names), 25)
+        self.assertEqual(set(names), {f'Item {i:02}' for i in range(25)})
+        self.assertIsNone(second['next'])
@@ -1,7 +1,28 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from inventory.models import Location, Item, ItemLog
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from inventory.models import (
+    Location, Item, ItemLog, LocationShare, Category, Tag, Notification, AnalyticsEvent, AnalyticsRollup,
+)
+from inventory.permissions import get_accessible_item_ids, IsOwnerOrShared, can_view_item, can_edit_item
 from inventory.choices import ROOM_CHOICES, CONDITION_CHOICES
+from inventory.utils import get_location_path, get_location_subtree_ids
+from inventory.analytics import track_view
+from inventory.analytics.services import (
+    track_event, start_event_buffer, flush_event_buffer, refresh_rollup, counted_events,
+)
+from inventory.notifications import get_unread_count, increment_unread_count, invalidate_unread_count
 
 
 class LocationModelTest(TestCase):
@@ -38,6 +59,23 @@ class LocationModelTest(TestCase):
         with self.assertRaises(ValueError):
             self.location.parent = child
             self.location.save()
+    
+    def test_location_path(self):
+        """Test the path of a location is loaded root first in one query"""
+        child = Location.objects.create(name='Child', parent=self.location)
+        grandchild = Location.objects.create(name='Grandchild', parent=child)
+        with self.assertNumQueries(1):
+            path = get_location_path(grandchild.id)
+        self.assertEqual(path, [self.location, child, grandchild])
+    
+    def test_location_subtree_ids(self):
+        """Test that a location's subtree ids include all its descendants"""
+        child = Location.objects.create(name='Child', parent=self.location)
+        grandchild = Location.objects.create(name='Grandchild', parent=child)
+        Location.objects.create(name='Sibling')
+        with self.assertNumQueries(1):
+            ids = get_location_subtree_ids(self.location.id)
+        self.assertEqual(ids, {self.location.id, child.id, grandchild.id})
 
 
 class ItemModelTest(TestCase):
@@ -151,3 +189,308 @@ class SignalsTest(TestCase):
         logs = ItemLog.objects.filter(item=item, action='moved')
         self.assertEqual(logs.count(), 1)
 
+
+class AccessibleIdsCacheTest(TestCase):
+    """Tests that cached accessible ids are invalidated by signals"""
+    
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.owner = User.objects.create_user('owner')
+        self.viewer = User.objects.create_user('viewer')
+        self.shared = Location.objects.create(name='Shared', owner=self.owner)
+        self.private = Location.objects.create(name='Private', owner=self.owner)
+        self.item = Item.objects.create(name='Test Item', location=self.shared, owner=self.owner)
+    
+    def test_share_and_move_invalidate_cache(self):
+        """Test that share changes and item moves refresh the cached item ids"""
+        self.assertEqual(get_accessible_item_ids(self.viewer), set())
+        share = LocationShare.objects.create(location=self.shared, user=self.viewer)
+        self.assertEqual(get_accessible_item_ids(self.viewer), {self.item.id})
+        
+        self.item.location = self.private
+        self.item.save()
+        self.assertEqual(get_accessible_item_ids(self.viewer), set())
+        
+        self.item.location = self.shared
+        self.item.save(update_fields=['location'])
+        self.assertEqual(get_accessible_item_ids(self.viewer), {self.item.id})
+        
+        share.delete()
+        self.assertEqual(get_accessible_item_ids(self.viewer), set())
+
+    def test_location_owner_cache_invalidated(self):
+        """Test that items created in or moved into another user's location refresh that owner's ids"""
+        other = get_user_model().objects.create_user('other')
+        other_location = Location.objects.create(name='Other', owner=other)
+        self.assertEqual(get_accessible_item_ids(other), set())
+        
+        item = Item.objects.create(name='Guest Item', location=other_location, owner=self.owner)
+        self.assertEqual(get_accessible_item_ids(other), {item.id})
+        
+        self.item.location = other_location
+        self.item.save(update_fields=['location'])
+        self.assertEqual(get_accessible_item_ids(other), {item.id, self.item.id})
+        
+        self.item.location = self.private
+        self.item.save()
+        self.assertEqual(get_accessible_item_ids(other), {item.id})
+    
+    def test_local_cache_skips_shared_cache(self):
+        """Test that repeated lookups are served by the in-process cache until invalidated"""
+        get_accessible_item_ids(self.viewer)
+        with self.assertNumQueries(0):
+            cache.clear()
+            self.assertEqual(get_accessible_item_ids(self.viewer), set())
+
+        LocationShare.objects.create(location=self.shared, user=self.viewer)
+        self.assertEqual(get_accessible_item_ids(self.viewer), {self.item.id})
+
+
+class SharePermissionTest(TestCase):
+    """Tests that object permission checks look up a user's share role once"""
+    
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create_user('owner')
+        self.editor = User.objects.create_user('editor')
+        location = Location.objects.create(name='Shared', owner=self.owner)
+        item = Item.objects.create(name='Test Item', location=location, owner=self.owner)
+        LocationShare.objects.create(location=location, user=self.editor, role='editor')
+        self.item_id = item.id
+    
+    def check_item(self, item):
+        request = RequestFactory().post('/')
+        request.user = self.editor
+        self.assertTrue(IsOwnerOrShared().has_object_permission(request, None, item))
+        self.assertTrue(can_view_item(self.editor, item))
+        self.assertTrue(can_edit_item(self.editor, item))
+    
+    def test_share_role_is_looked_up_once(self):
+        """Test the permission class and can_* checks share the role lookups"""
+        item = Item.objects.get(pk=self.item_id)
+        # Item share, location row and location share
+        with self.assertNumQueries(3):
+            self.check_item(item)
+    
+    def test_prefetched_shares_are_used(self):
+        """Test prefetched shares answer the checks without queries"""
+        item = Item.objects.select_related('location').prefetch_related('shares', 'location__shares').get(
+            pk=self.item_id
+        )
+        with self.assertNumQueries(0):
+            self.check_item(item)
+
+
+class LocationAdminFormTest(TestCase):
+    """Tests for the location admin form"""
+    
+    def test_parent_choices_exclude_subtree(self):
+        """Test that a location cannot get itself or one of its descendants as parent"""
+        root = Location.objects.create(name='Root')
+        child = Location.objects.create(name='Child', parent=root)
+        grandchild = Location.objects.create(name='Grandchild', parent=child)
+        other = Location.objects.create(name='Other')
+        
+        request = RequestFactory().get('/')
+        request.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'secret')
+        form = admin.site._registry[Location].get_form(request, child)
+        self.assertEqual(set(form.base_fields['parent'].queryset), {root, other})
+
+
+class AdminConditionActionTest(TestCase):
+    """Tests that bulk condition actions in the admin only invalidate the affected cache keys"""
+    
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        self.owner = User.objects.create_user('owner')
+        self.item = Item.objects.create(name='Test Item', owner=self.owner)
+        self.client.force_login(self.admin)
+    
+    def test_mark_as_damaged(self):
+        """Test that the action logs the change and keeps unrelated cache keys"""
+        cache.set('unrelated', 1)
+        self.assertEqual(get_accessible_item_ids(self.owner), {self.item.id})
+        
+        response = self.client.post(reverse('admin:inventory_item_changelist'), {
+            'action': 'mark_as_damaged',
+            '_selected_action': [self.item.id],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.condition, 'damaged')
+        self.assertTrue(ItemLog.objects.filter(item=self.item, action='updated').exists())
+        
+        self.assertEqual(cache.get('unrelated'), 1)
+        self.assertIsNone(cache.get(f'user:{self.owner.id}:items'))
+
+
+class TrackViewTest(TestCase):
+    """Tests for the track_view decorator"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('user')
+        self.item = Item.objects.create(name='Test Item', owner=self.user)
+        
+        @track_view('item_view', lambda request, item_id: (Item, item_id))
+        def item_view(request, item_id):
+            return HttpResponse()
+        self.view = item_view
+    
+    def test_event_recorded_after_commit(self):
+        """Test that a tracked view records exactly one event, once the transaction commits"""
+        request = RequestFactory().get('/')
+        request.user = self.user
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.view(request, self.item.id)
+            self.assertFalse(AnalyticsEvent.objects.exists())
+        
+        self.assertEqual(len(callbacks), 1)
+        event = AnalyticsEvent.objects.get()
+        self.assertEqual((event.event_type, event.object_id, event.user), ('item_view', self.item.id, self.user))
+    
+    def test_head_request_not_tracked(self):
+        """Test that HEAD requests are not tracked"""
+        request = RequestFactory().head('/')
+        request.user = self.user
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.view(request, self.item.id)
+        self.assertEqual(callbacks, [])
+
+
+class GenerateTestDataCommandTest(TestCase):
+    """Tests for the generate_test_data management command"""
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+    
+    def generate(self, seed):
+        """Regenerate the data with a seed and return a snapshot of it"""
+        call_command('generate_test_data', clear=True, seed=seed, verbosity=0, stdout=StringIO())
+        items = sorted(
+            (item.name, item.location.name, item.category.name, sorted(tag.name for tag in item.tags.all()))
+            for item in Item.objects.select_related('location', 'category').prefetch_related('tags')
+        )
+        logs = sorted(ItemLog.objects.values_list('item__name', 'action', 'details'))
+        return items, logs
+    
+    def test_row_counts_and_qr_codes(self):
+        """Test that the command creates the expected rows and a QR code for every box"""
+        self.generate(seed=1)
+        self.assertEqual(Location.objects.count(), 20)
+        self.assertEqual(Category.objects.count(), 8)
+        self.assertEqual(Tag.objects.count(), 8)
+        self.assertEqual(Item.objects.count(), 32)
+        self.assertEqual(ItemLog.objects.filter(details__contains='was created in').count(), 32)
+        
+        boxes = Location.objects.filter(is_box=True)
+        self.assertEqual(boxes.count(), 8)
+        self.assertFalse(boxes.filter(qr_code='').exists())
+    
+    def test_seed_is_deterministic(self):
+        """Test that the same seed generates the same data"""
+        self.assertEqual(self.generate(seed=42), self.generate(seed=42))
+        self.assertNotEqual(self.generate(seed=42), self.generate(seed=7))
+
+
+class AnalyticsBufferTest(TestCase):
+    """Tests for buffering analytics events during a request"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('user')
+        self.addCleanup(flush_event_buffer)
+    
+    def test_buffered_events_written_in_one_insert(self):
+        """Test that events tracked while the buffer is active are written together on flush"""
+        start_event_buffer()
+        track_event(self.user, 'item_search')
+        track_event(self.user, 'location_search')
+        self.assertFalse(AnalyticsEvent.objects.exists())
+        
+        with self.assertNumQueries(1):
+            flush_event_buffer()
+        self.assertEqual(AnalyticsEvent.objects.filter(user=self.user).count(), 2)
+        
+        # Without a buffer the event is saved immediately
+        track_event(self.user, 'item_search')
+        self.assertEqual(AnalyticsEvent.objects.filter(user=self.user).count(), 3)
+
+
+class AnalyticsRollupTest(TestCase):
+    """Tests for hourly analytics rollups"""
+    
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('user')
+        self.item = Item.objects.create(name='Test Item', owner=self.user)
+        for _ in range(3):
+            track_event(self.user, 'item_view', content_object=self.item)
+        track_event(self.user, 'item_search')
+        self.since = timezone.now() - timedelta(hours=1)
+    
+    def test_refresh_rollup_is_repeatable(self):
+        """Test that refreshing the same window replaces its buckets"""
+        self.assertEqual(refresh_rollup(self.since), 2)
+        self.assertEqual(refresh_rollup(self.since), 2)
+        self.assertEqual(AnalyticsRollup.objects.count(), 2)
+        self.assertEqual(AnalyticsRollup.objects.get(event_type='item_view').count, 3)
+    
+    def test_duplicate_bucket_rejected(self):
+        """Test that a second row for the same bucket violates the unique constraint"""
+        refresh_rollup(self.since)
+        bucket = AnalyticsRollup.objects.get(event_type='item_view')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AnalyticsRollup.objects.create(
+                user=bucket.user, event_type=bucket.event_type, content_type=bucket.content_type,
+                object_id=bucket.object_id, bucket_hour=bucket.bucket_hour, count=1,
+            )
+    
+    def test_counted_events_reads_rollup(self):
+        """Test that statistics count the same events from the rollup when it is enabled"""
+        call_command('rollup_analytics', hours=1, stdout=StringIO())
+        
+        events, count = counted_events(self.since)
+        self.assertEqual(events.model, AnalyticsEvent)
+        raw_total = events.aggregate(total=count())['total']
+        
+        with override_settings(ANALYTICS_USE_ROLLUP=True):
+            events, count = counted_events(self.since)
+        self.assertEqual(events.model, AnalyticsRollup)
+        self.assertEqual(events.aggregate(total=count())['total'], raw_total)
+        self.assertEqual(raw_total, 4)
+
+
+class UnreadCountTest(TestCase):
+    """Tests for the cached unread notification counter"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('user')
+    
+    def create_notification(self):
+        return Notification.objects.create(user=self.user, notification_type='item_created', message='Test')
+    
+    def test_counter_follows_notifications(self):
+        """Test that the counter is served from cache and kept current by signals"""
+        self.create_notification()
+        self.assertEqual(get_unread_count(self.user), 1)
+        
+        self.create_notification()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user), 2)
+        
+        Notification.objects.filter(user=self.user).update(read=True)
+        invalidate_unread_count(self.user.id)
+        self.assertEqual(get_unread_count(self.user), 0)
+    
+    def test_increment_without_counter(self):
+        """Test that incrementing a counter that is not cached leaves it to be counted on read"""
+        self.create_notification()
+        invalidate_unread_count(self.user.id)
+        increment_unread_count(self.user.id)
+        self.assertEqual(get_unread_count(self.user), 1)
@@ -12,7 +12,10 @@ from .cache import (
     invalidate_location_cache,
     invalidate_item_cache,
     invalidate_user_cache,
+    invalidate_items_cache,
     get_cached_or_set,
+    get_local_cached_or_set,
+    invalidate_local_cache,
     CACHE_TIMEOUT_SHORT,
     CACHE_TIMEOUT_MEDIUM,
     CACHE_TIMEOUT_LONG,
@@ -30,6 +33,9 @@ from .queries import (
     optimize_itemlog_queryset,
     optimize_category_queryset,
     optimize_tag_queryset,
+    count_subquery,
+    get_location_path,
+    get_location_subtree_ids,
     get_optimized_statistics,
 )
 
@@ -41,7 +47,10 @@ __all__ = [
     'invalidate_location_cache',
     'invalidate_item_cache',
     'invalidate_user_cache',
+    'invalidate_items_cache',
     'get_cached_or_set',
+    'get_local_cached_or_set',
+    'invalidate_local_cache',
     'CACHE_TIMEOUT_SHORT',
     'CACHE_TIMEOUT_MEDIUM',
     'CACHE_TIMEOUT_LONG',
@@ -58,6 +67,9 @@ __all__ = [
     'optimize_itemlog_queryset',
     'optimize_category_queryset',
     'optimize_tag_queryset',
+    'count_subquery',
+    'get_location_path',
+    'get_location_subtree_ids',
     'get_optimized_statistics',
 ]
 
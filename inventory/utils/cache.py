@@ -3,9 +3,12 @@ Cache utilities for Home Inventory application.
 """
 from django.core.cache import cache
 from django.core.cache.utils import make_template_fragment_key
+from collections import OrderedDict
 from functools import wraps
 import hashlib
 import json
+import threading
+import time
 
 
 # Cache timeouts (in seconds)
@@ -14,6 +17,12 @@ CACHE_TIMEOUT_MEDIUM = 300  # 5 minutes
 CACHE_TIMEOUT_LONG = 3600  # 1 hour
 CACHE_TIMEOUT_STATS = 600  # 10 minutes
 
+# Per-process (L1) cache in front of the shared cache, see get_local_cached_or_set()
+LOCAL_CACHE_TIMEOUT = 5  # 5 seconds
+LOCAL_CACHE_MAX_SIZE = 256
+_local_cache = OrderedDict()  # key -> (expires_at, value), least recently used first
+_local_cache_lock = threading.Lock()
+
 
 def get_cache_key(prefix, *args, **kwargs):
     """
@@ -95,8 +104,10 @@ def invalidate_cache_pattern(pattern):
         # For LocMemCache, we can't pattern match, so clear all
         # In production with Redis, you would use: cache.delete_pattern(pattern)
         cache.clear()
+        invalidate_local_cache()
     else:
         cache.delete(pattern)
+        invalidate_local_cache(pattern)
 
 
 def invalidate_location_cache(location_id=None):
@@ -124,8 +135,7 @@ def invalidate_item_cache(item_id=None):
         item_id: Specific item ID, or None for all items
     """
     if item_id:
-        cache.delete(f'item:{item_id}')
-        cache.delete(f'item:{item_id}:logs')
+        cache.delete_many(get_item_cache_keys(item_id))
     else:
         # Invalidate all item-related cache
         invalidate_cache_pattern('item:*')
@@ -140,13 +150,44 @@ def invalidate_user_cache(user_id=None):
         user_id: Specific user ID, or None for all users
     """
     if user_id:
-        cache.delete(f'user:{user_id}:locations')
-        cache.delete(f'user:{user_id}:items')
+        keys = get_user_cache_keys(user_id)
+        cache.delete_many(keys)
+        invalidate_local_cache(*keys)
     else:
         invalidate_cache_pattern('user:*')
         invalidate_cache_pattern('stats:*')
 
 
+def get_item_cache_keys(item_id):
+    """Cache keys of an item, including the first page of its logs (newest entries)"""
+    return [f'item:{item_id}', f'item:{item_id}:logs', get_cache_key('item:logs:json', item_id, 'head')]
+
+
+def get_user_cache_keys(user_id):
+    """Cache keys of a user's accessible ids and share roles"""
+    return [f'user:{user_id}:locations', f'user:{user_id}:items', f'user:{user_id}:share_roles']
+
+
+def invalidate_items_cache(item_ids, owner_ids=()):
+    """
+    Invalidate cache of the given items and their owners with one delete_many().
+    
+    For bulk queryset updates, which send no signals: unlike invalidate_item_cache()
+    without an ID, other keys (tokens, unread counters, ...) are kept.
+    
+    Args:
+        item_ids: IDs of the updated items
+        owner_ids: IDs of their owners
+    """
+    keys = []
+    for item_id in item_ids:
+        keys += get_item_cache_keys(item_id)
+    for owner_id in owner_ids:
+        keys += get_user_cache_keys(owner_id) + [get_cache_key('stats:home', owner_id)]
+    cache.delete_many(keys)
+    invalidate_local_cache(*keys)
+
+
 def get_cached_or_set(key, callable_func, timeout=CACHE_TIMEOUT_MEDIUM):
     """
     Get value from cache or set it using callable.
@@ -166,6 +207,52 @@ def get_cached_or_set(key, callable_func, timeout=CACHE_TIMEOUT_MEDIUM):
     return value
 
 
+def get_local_cached_or_set(key, callable_func, timeout=CACHE_TIMEOUT_MEDIUM):
+    """
+    get_cached_or_set() with a per-process LRU cache (L1) in front of the shared cache (L2).
+    
+    L1 entries live for LOCAL_CACHE_TIMEOUT seconds: invalidations made in another
+    process are seen within that delay. Cached values are shared, callers must not
+    modify them.
+    
+    Args:
+        key: Cache key
+        callable_func: Function to call if both caches miss
+        timeout: Shared cache timeout in seconds
+    
+    Returns:
+        Cached or computed value
+    """
+    now = time.monotonic()
+    with _local_cache_lock:
+        entry = _local_cache.get(key)
+        if entry is not None and entry[0] > now:
+            _local_cache.move_to_end(key)
+            return entry[1]
+    
+    value = get_cached_or_set(key, callable_func, timeout)
+    with _local_cache_lock:
+        _local_cache[key] = (now + LOCAL_CACHE_TIMEOUT, value)
+        _local_cache.move_to_end(key)
+        while len(_local_cache) > LOCAL_CACHE_MAX_SIZE:
+            _local_cache.popitem(last=False)
+    return value
+
+
+def invalidate_local_cache(*keys):
+    """
+    Drop keys from this process's L1 cache, or all of it when no keys are given.
+    
+    Args:
+        *keys: Cache keys to drop
+    """
+    with _local_cache_lock:
+        if not keys:
+            _local_cache.clear()
+        for key in keys:
+            _local_cache.pop(key, None)
+
+
 # Cache key prefixes
 CACHE_KEY_STATS = 'stats'
 CACHE_KEY_LOCATION = 'location'
@@ -4,6 +4,12 @@ Query optimization utilities for Home Inventory application.
 from django.db import models
 
 
+# ItemLog columns read by ItemLogSerializer and the item detail template
+ITEMLOG_PREFETCH_FIELDS = (
+    'id', 'item_id', 'action', 'details', 'timestamp', 'user__id', 'user__username',
+)
+
+
 def optimize_location_queryset(queryset=None):
     """
     Optimize Location queryset with select_related and prefetch_related.
@@ -45,11 +51,18 @@ def optimize_item_queryset(queryset=None):
     Returns:
         Optimized queryset
     """
-    from ..models import Item
+    from ..models import Item, ItemLog
+    from django.db.models import Prefetch
     
     if queryset is None:
         queryset = Item.objects.all()
     
+    # Logs only need their own serialized columns and the user's username
+    logs_prefetch = Prefetch(
+        'logs',
+        queryset=ItemLog.objects.select_related('user').only(*ITEMLOG_PREFETCH_FIELDS).order_by('-timestamp'),
+    )
+    
     return queryset.select_related(
         'location__parent',
         'location__owner',
@@ -59,7 +72,7 @@ def optimize_item_queryset(queryset=None):
         'tags',
         'shares__user',
         'shares__created_by',
-        'logs__user',
+        logs_prefetch,
     )
 
 
@@ -130,6 +143,93 @@ def optimize_tag_queryset(queryset=None):
     )
 
 
+def count_subquery(model, fk_field):
+    """
+    Count related rows with a correlated subquery.
+    
+    Several Count() annotations over different relations in one query produce
+    LEFT JOINs whose row product DISTINCT then has to collapse; a separate
+    COUNT(*) over the FK index does not.
+    
+    Args:
+        model: Model of the related rows
+        fk_field: Name of the FK on `model` pointing at the annotated model
+    
+    Returns:
+        Expression for annotate()
+    """
+    from django.db.models import Count, IntegerField, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+    
+    counts = model.objects.filter(**{fk_field: OuterRef('pk')}).order_by().values(fk_field).annotate(
+        c=Count('*')
+    ).values('c')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def get_location_path(location_id, max_depth=100):
+    """
+    A location and its ancestors, root first, loaded with one recursive CTE query
+    instead of one query per parent.
+    
+    Args:
+        location_id: ID of the location to start from
+        max_depth: Maximum number of ancestors followed (guards against cycles)
+    
+    Returns:
+        List of Location instances from the root down to the location itself
+    """
+    from ..models import Location
+    from django.db import connection
+    
+    table = connection.ops.quote_name(Location._meta.db_table)
+    location_id = Location._meta.pk.get_db_prep_value(location_id, connection)
+    return list(Location.objects.raw(
+        f"""
+        WITH RECURSIVE path AS (
+            SELECT location.*, 0 AS depth FROM {table} location WHERE location.id = %s
+            UNION ALL
+            SELECT parent.*, path.depth + 1 FROM {table} parent
+            JOIN path ON parent.id = path.parent_id
+            WHERE path.depth < %s
+        )
+        SELECT * FROM path ORDER BY depth DESC
+        """,
+        [location_id, max_depth],
+    ))
+
+
+def get_location_subtree_ids(location_id, max_depth=100):
+    """
+    IDs of a location and all its descendants, loaded with one recursive CTE query.
+    
+    Args:
+        location_id: ID of the subtree root
+        max_depth: Maximum number of levels followed (guards against cycles)
+    
+    Returns:
+        Set of location IDs, including location_id itself
+    """
+    from ..models import Location
+    from django.db import connection
+    
+    table = connection.ops.quote_name(Location._meta.db_table)
+    location_id = Location._meta.pk.get_db_prep_value(location_id, connection)
+    return {location.id for location in Location.objects.raw(
+        f"""
+        WITH RECURSIVE subtree AS (
+            SELECT location.id, 0 AS depth FROM {table} location WHERE location.id = %s
+            UNION
+            SELECT child.id, subtree.depth + 1 FROM {table} child
+            JOIN subtree ON child.parent_id = subtree.id
+            WHERE subtree.depth < %s
+        )
+        SELECT id FROM subtree
+        """,
+        [location_id, max_depth],
+    )}
+
+
 def get_optimized_statistics():
     """
     Get optimized statistics using single queries with annotations.
@@ -2,8 +2,9 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
+from django.utils import timezone
 from .models import Location, Item, ItemLog, Category, Tag, Notification
-from .choices import ROOM_CHOICES
+from .choices import ROOM_CHOICES, RoomChoices
 from .permissions import (
     can_view_location, can_edit_location, can_view_item, can_edit_item,
     get_accessible_location_ids, get_accessible_item_ids,
@@ -13,13 +14,14 @@ from .utils import (
     get_cached_or_set, get_cache_key, CACHE_TIMEOUT_STATS,
     invalidate_location_cache, invalidate_item_cache,
     optimize_location_queryset, optimize_item_queryset,
-    optimize_itemlog_queryset, get_optimized_statistics
+    optimize_itemlog_queryset, get_optimized_statistics, get_location_path
 )
 from .exceptions.decorators import handle_exceptions
 from .analytics.services import (
     track_event, get_popular_items, get_popular_locations,
     get_usage_statistics, get_user_activity
 )
+from .notifications import get_unread_count, invalidate_unread_count
 
 # Create your views here.
 
@@ -186,12 +188,8 @@ def location_detail(request, location_id):
     items_count = len(items)
     children_count = len(children)
     
-    # Get path to root (breadcrumbs)
-    breadcrumbs = []
-    current = location
-    while current:
-        breadcrumbs.insert(0, current)
-        current = current.parent
+    # Get path to root (breadcrumbs), all ancestors in one query
+    breadcrumbs = get_location_path(location.id)
     
     # Check if user can edit
     can_edit = can_edit_location(request.user, location)
@@ -340,8 +338,7 @@ def item_detail(request, item_id):
 def room_view(request, room_type):
     """View items by room type (optimized)"""
     # Validate room type
-    valid_room_types = [choice[0] for choice in ROOM_CHOICES]
-    if room_type not in valid_room_types:
+    if room_type not in RoomChoices.values:
         from django.http import Http404
         raise Http404("Room type not found")
     
@@ -475,7 +472,7 @@ def notification_list(request):
     page_obj = paginator.get_page(page_number)
     
     # Get unread count
-    unread_count = Notification.objects.filter(user=request.user, read=False).count()
+    unread_count = get_unread_count(request.user)
     
     context = {
         'notifications': page_obj,
@@ -493,6 +490,7 @@ def notification_mark_read(request, notification_id):
     """Mark a notification as read"""
     notification = get_object_or_404(Notification, id=notification_id, user=request.user)
     notification.read = True
+    notification.read_at = timezone.now()
     notification.save()
     
     # Redirect back to notification list or referrer
@@ -504,7 +502,8 @@ def notification_mark_read(request, notification_id):
 @handle_exceptions
 def notification_mark_all_read(request):
     """Mark all notifications as read"""
-    Notification.objects.filter(user=request.user, read=False).update(read=True)
+    Notification.objects.filter(user=request.user, read=False).update(read=True, read_at=timezone.now())
+    invalidate_unread_count(request.user.id)
     
     # Redirect back to notification list
     return redirect('notification_list')